@@ -1,5 +1,12 @@
+import asyncio
+import hashlib
+import json
+import logging
 import time
+from typing import Any
 
+import numpy as np
+from cachetools import TTLCache
 from fastapi import APIRouter, Depends, HTTPException
 from qdrant_client.models import ScoredPoint
 
@@ -9,8 +16,29 @@ from app.models.api import ChatRequest, ChatResponse, SearchResult
 from app.services.gemini_client import GeminiClient
 from app.services.vector_store import VectorStore
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Reciprocal Rank Fusion weights 1 / (k + rank + 1), precomputed for early ranks
+_RRF_K = 60
+_RRF_WEIGHTS = 1.0 / (_RRF_K + 1 + np.arange(1024))
+
+# Exact-match cache of final responses, keyed by _response_cache_key
+_response_cache: TTLCache[str, ChatResponse] = TTLCache(
+    maxsize=settings.RESPONSE_CACHE_SIZE, ttl=settings.RESPONSE_CACHE_TTL_SECONDS
+)
+
+# Rerank relevance scores, keyed by (query digest, chunk id)
+_rerank_cache: TTLCache[tuple[str, str], float] = TTLCache(
+    maxsize=settings.RERANK_CACHE_SIZE, ttl=settings.RERANK_CACHE_TTL_SECONDS
+)
+
+
+def clear_response_cache() -> None:
+    """Drop cached chat responses and rerank scores (e.g. after deletions)."""
+    _response_cache.clear()
+    _rerank_cache.clear()
+
 
 async def _generate_expanded_queries(
     user_query: str, gemini_client: GeminiClient
@@ -18,19 +46,26 @@ async def _generate_expanded_queries(
     """Generate multiple query variations (Multi-query, Step-back, HyDE)."""
     queries = [user_query]
 
-    # Multi-queries
-    multi_queries = await gemini_client.generate_multi_queries(user_query)
-    queries.extend(multi_queries)
-
-    # Step-back query
-    step_back_query = await gemini_client.generate_step_back_query(user_query)
-    if step_back_query:
-        queries.append(step_back_query)
+    # The three expansions are independent, so issue them concurrently
+    multi_queries, step_back_query, hypothetical_answer = await asyncio.gather(
+        gemini_client.generate_multi_queries(user_query),
+        gemini_client.generate_step_back_query(user_query),
+        gemini_client.generate_hypothetical_answer(user_query),
+        return_exceptions=True,
+    )
 
-    # HyDE
-    hypothetical_answer = await gemini_client.generate_hypothetical_answer(user_query)
-    if hypothetical_answer:
-        queries.append(hypothetical_answer)
+    # Multi-queries
+    if isinstance(multi_queries, BaseException):
+        logger.warning(f"Multi-query generation failed: {multi_queries!s}")
+    else:
+        queries.extend(multi_queries)
+
+    # Step-back query and HyDE
+    for expansion in (step_back_query, hypothetical_answer):
+        if isinstance(expansion, BaseException):
+            logger.warning(f"Query expansion failed: {expansion!s}")
+        elif expansion:
+            queries.append(expansion)
 
     # Deduplicate while preserving order
     return list(dict.fromkeys(queries))
@@ -41,40 +76,65 @@ async def _perform_search_and_fusion(
     gemini_client: GeminiClient,
     vector_store: VectorStore,
     top_k: int,
+    precomputed: dict[str, list[float]] | None = None,
 ) -> list[ScoredPoint]:
     """Perform batch search and apply RAG-Fusion (RRF)."""
-    # Generate embeddings
-    query_embeddings = []
-    for query in queries:
-        emb = await gemini_client.get_query_embedding(query)
-        query_embeddings.append(emb)
-
-    # Batch Search (Oversampling)
+    # Generate embeddings (single batched request for all query variants),
+    # reusing any the caller already has
+    vectors = dict(precomputed or {})
+    missing = [q for q in queries if q not in vectors]
+    if missing:
+        embedded = await gemini_client.get_query_embeddings_batch(missing)
+        vectors.update(zip(missing, embedded, strict=True))
+    query_embeddings = [vectors[q] for q in queries]
+
+    # Batch Search (Oversampling); embedding reranking needs the hit vectors
     batch_results = await vector_store.search_batch(
-        query_vectors=query_embeddings, limit=top_k * 2
+        query_vectors=query_embeddings,
+        limit=top_k * 2,
+        with_vectors=settings.RERANK_STRATEGY == "embedding",
     )
 
     # RAG-Fusion: Reciprocal Rank Fusion (RRF)
-    rrf_k = 60
-    doc_scores: dict[str, float] = {}
-    doc_objects: dict[str, ScoredPoint] = {}
+    # Hit ids are interned to array slots so scores accumulate in one array
+    max_hits = max((len(hits) for hits in batch_results), default=0)
+    rrf_weights = (
+        _RRF_WEIGHTS
+        if max_hits <= _RRF_WEIGHTS.size
+        else 1.0 / (_RRF_K + 1 + np.arange(max_hits))
+    )
+    scores = np.zeros(sum(len(hits) for hits in batch_results))
+    id_to_idx: dict[str, int] = {}
+    doc_objects: list[ScoredPoint] = []
 
-    for _, hits in enumerate(batch_results):
+    for hits in batch_results:
+        idxs = np.empty(len(hits), dtype=np.intp)
         for rank, hit in enumerate(hits):
-            hit_id = str(hit.id)
-            if hit_id not in doc_objects:
-                doc_objects[hit_id] = hit
-                doc_scores[hit_id] = 0.0
-
-            doc_scores[hit_id] += 1.0 / (rrf_k + rank + 1)
+            idx = id_to_idx.setdefault(str(hit.id), len(doc_objects))
+            if idx == len(doc_objects):
+                doc_objects.append(hit)
+            idxs[rank] = idx
+        np.add.at(scores, idxs, rrf_weights[: len(hits)])
+
+    # Select top K unique documents (still oversampled for re-ranking)
+    n_docs = len(doc_objects)
+    limit = min(top_k * 2, n_docs)
+    if limit == 0:
+        return []
 
-    # Sort by RRF score descending
-    sorted_doc_ids = sorted(
-        doc_scores.keys(), key=lambda x: doc_scores[x], reverse=True
-    )
+    scores = scores[:n_docs]
+    if limit < n_docs:
+        # O(n) selection; ties at the cutoff keep their first-appearance order
+        cutoff = -np.partition(-scores, limit - 1)[limit - 1]
+        above = np.flatnonzero(scores > cutoff)
+        ties = np.flatnonzero(scores == cutoff)[: limit - len(above)]
+        candidates = np.concatenate((above, ties))
+    else:
+        candidates = np.arange(n_docs)
 
-    # Return top K unique documents (still oversampled for re-ranking)
-    return [doc_objects[doc_id] for doc_id in sorted_doc_ids[: top_k * 2]]
+    # Sort by RRF score descending, ties broken by first appearance
+    order = candidates[np.lexsort((candidates, -scores[candidates]))]
+    return [doc_objects[i] for i in order]
 
 
 async def _rerank_results(
@@ -82,31 +142,141 @@ async def _rerank_results(
     hits: list[ScoredPoint],
     gemini_client: GeminiClient,
     top_k: int,
+) -> tuple[list[ScoredPoint], bool]:
+    """
+    Rerank search results using Gemini. Also returns whether the reranking
+    succeeded; if not, the uncached hits keep their search order.
+    """
+    candidates = [(hit, hit.payload.get("content", "")) for hit in hits if hit.payload]
+
+    if not candidates:
+        return [], True
+
+    # Reuse scores from recent reranks of the same query and chunk
+    query_key = hashlib.blake2b(
+        user_query.strip().lower().encode(), digest_size=16
+    ).hexdigest()
+    scores: dict[int, float] = {}
+    uncached: list[int] = []
+    for i, (hit, _) in enumerate(candidates):
+        cached_score = _rerank_cache.get((query_key, str(hit.id)))
+        if cached_score is None:
+            uncached.append(i)
+        else:
+            scores[i] = cached_score
+
+    # Call Gemini once to rerank all remaining documents; identical chunks
+    # (e.g. from re-uploaded files) are sent once and share the score
+    reranked = True
+    if uncached:
+        by_content: dict[str, list[int]] = {}
+        for i in uncached:
+            by_content.setdefault(candidates[i][1], []).append(i)
+        documents = list(by_content)
+
+        try:
+            ranked_indices = await gemini_client.rerank_documents(
+                query=user_query, documents=documents, top_n=len(documents)
+            )
+        except Exception as e:
+            logger.warning(f"Reranking failed, keeping search order: {e!s}")
+            # Placeholder scores keep the search order and are not cached, so
+            # the next request reranks these chunks again
+            ranked_indices = [(idx, 1.0 - idx * 0.01) for idx in range(len(documents))]
+            reranked = False
+
+        for idx, score in ranked_indices:
+            if idx < len(documents):
+                for i in by_content[documents[idx]]:
+                    scores[i] = score
+                    if reranked:
+                        _rerank_cache[(query_key, str(candidates[i][0].id))] = score
+
+    # Select top hits based on ranking
+    final_hits = []
+    for i in sorted(scores, key=lambda i: scores[i], reverse=True)[:top_k]:
+        hit = candidates[i][0]
+        # Update score with re-ranking score
+        hit.score = scores[i]
+        final_hits.append(hit)
+
+    return final_hits, reranked
+
+
+def _rerank_by_similarity(
+    query_embedding: list[float], hits: list[ScoredPoint], top_k: int
 ) -> list[ScoredPoint]:
-    """Rerank search results using Gemini."""
-    docs_to_rerank = [
-        hit.payload.get("content", "") for hit in hits if hit.payload
-    ]
+    """Rerank search results by cosine similarity to the user query."""
+    candidates = [hit for hit in hits if hit.payload and hit.vector is not None]
 
-    if not docs_to_rerank:
+    if not candidates:
         return []
 
-    # Call Gemini to rerank
-    ranked_indices = await gemini_client.rerank_documents(
-        query=user_query, documents=docs_to_rerank, top_n=top_k
-    )
+    doc_vectors = np.asarray([hit.vector for hit in candidates], dtype=np.float32)
+    query_vector = np.asarray(query_embedding, dtype=np.float32)
+    norms = np.linalg.norm(doc_vectors, axis=1) * np.linalg.norm(query_vector)
+    scores = doc_vectors @ query_vector / np.maximum(norms, np.finfo(np.float32).tiny)
 
-    # Select top hits based on ranking
+    # Sort by similarity descending, ties keep fusion order
     final_hits = []
-    for idx, score in ranked_indices:
-        if idx < len(hits):
-            hit = hits[idx]
-            # Update score with re-ranking score
-            hit.score = score
-            final_hits.append(hit)
+    for i in np.argsort(-scores, kind="stable")[:top_k]:
+        hit = candidates[i]
+        hit.score = float(scores[i])
+        final_hits.append(hit)
 
     return final_hits
 
+
+def _cache_scope(context_filter: dict[str, Any] | None, top_k: int) -> str:
+    """Identify the retrieval settings a cached response is valid for."""
+    raw = json.dumps([context_filter, top_k], sort_keys=True, default=str)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _response_cache_key(user_query: str, scope: str) -> str:
+    """Key a response by the normalized user query and retrieval scope."""
+    raw = json.dumps([user_query.strip().lower(), scope])
+    return hashlib.blake2b(raw.encode()).hexdigest()
+
+
+async def _lookup_semantic_cache(
+    query_embedding: list[float], scope: str, vector_store: VectorStore
+) -> ChatResponse | None:
+    """Return the cached response of a near-identical earlier prompt, if any."""
+    try:
+        cached = await vector_store.search_cached_response(
+            query_vector=query_embedding,
+            scope=scope,
+            score_threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            max_age_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+        )
+        return ChatResponse.model_validate(cached) if cached else None
+    except Exception as e:
+        logger.warning(f"Semantic cache lookup failed: {e!s}")
+        return None
+
+
+async def _store_semantic_cache(
+    query_embedding: list[float],
+    scope: str,
+    cache_key: str,
+    response: ChatResponse,
+    vector_store: VectorStore,
+) -> None:
+    """Remember a response so paraphrased prompts can reuse it."""
+    try:
+        await vector_store.cache_response(
+            query_vector=query_embedding,
+            scope=scope,
+            response=response.model_dump(mode="json"),
+            document_ids=list({str(c.document_id) for c in response.citations}),
+            key=cache_key,
+            max_age_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+        )
+    except Exception as e:
+        logger.warning(f"Failed to store response in semantic cache: {e!s}")
+
+
 @router.post("/", response_model=ChatResponse)
 async def chat_with_documents(
     request: ChatRequest,
@@ -122,19 +292,51 @@ async def chat_with_documents(
         if not user_query:
             raise HTTPException(status_code=400, detail="No user message found")
 
+        # 0. Response caches: exact repeat first, then semantic (paraphrase) match
+        cache_scope = _cache_scope(request.context_filter, settings.TOP_K_RESULTS)
+        cache_key = _response_cache_key(user_query, cache_scope)
+        cached_response = _response_cache.get(cache_key)
+
+        query_embedding: list[float] | None = None
+        if cached_response is None and settings.SEMANTIC_CACHE_ENABLED:
+            query_embedding = await gemini_client.get_query_embedding(user_query)
+            cached_response = await _lookup_semantic_cache(
+                query_embedding, cache_scope, vector_store
+            )
+            if cached_response is not None:
+                _response_cache[cache_key] = cached_response
+
+        if cached_response is not None:
+            return cached_response.model_copy(
+                update={"processing_time_ms": int((time.time() - start_time) * 1000)}
+            )
+
+        if query_embedding is None and settings.RERANK_STRATEGY == "embedding":
+            query_embedding = await gemini_client.get_query_embedding(user_query)
+
         # 1. Advanced RAG: Query Generation
         unique_queries = await _generate_expanded_queries(user_query, gemini_client)
         print(f"Generated queries: {unique_queries}")
 
         # 2. Search for relevant context (Multi-Query Search + RAG-Fusion)
         all_hits = await _perform_search_and_fusion(
-            unique_queries, gemini_client, vector_store, settings.TOP_K_RESULTS
+            unique_queries,
+            gemini_client,
+            vector_store,
+            settings.TOP_K_RESULTS,
+            precomputed={user_query: query_embedding} if query_embedding else None,
         )
 
         # 3. Re-ranking
-        final_hits = await _rerank_results(
-            user_query, all_hits, gemini_client, settings.TOP_K_RESULTS
-        )
+        reranked = True
+        if settings.RERANK_STRATEGY == "embedding" and query_embedding is not None:
+            final_hits = _rerank_by_similarity(
+                query_embedding, all_hits, settings.TOP_K_RESULTS
+            )
+        else:
+            final_hits, reranked = await _rerank_results(
+                user_query, all_hits, gemini_client, settings.TOP_K_RESULTS
+            )
 
         # 4. Construct context and citations
         context_parts = []
@@ -167,11 +369,23 @@ async def chat_with_documents(
 
         processing_time = int((time.time() - start_time) * 1000)
 
-        return ChatResponse(
+        chat_response = ChatResponse(
             response=response_text,
             citations=citations,
             processing_time_ms=processing_time,
         )
 
+        # An answer built on the fallback order would outlive the rerank failure
+        if not reranked:
+            return chat_response
+
+        _response_cache[cache_key] = chat_response
+        if settings.SEMANTIC_CACHE_ENABLED and query_embedding is not None:
+            await _store_semantic_cache(
+                query_embedding, cache_scope, cache_key, chat_response, vector_store
+            )
+
+        return chat_response
+
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
@@ -1,34 +1,113 @@
+import asyncio
+import base64
+import binascii
+import logging
 import uuid
 from collections.abc import Sequence
+from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import ScalarResult, delete, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from app.api.dependencies import get_vector_store
+from app.api.routes.chat import clear_response_cache
 from app.core.database import get_db
 from app.models.api import DocumentResponse
-from app.models.sql import Document
+from app.models.sql import Chunk, Document
 from app.services.vector_store import VectorStore
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+async def _delete_document_vectors(
+    vector_store: VectorStore, document_id: str, point_ids: list[str]
+) -> None:
+    """
+    Delete a document's vectors and the cached answers citing it. Each step is
+    retried once, then logged without failing the request.
+    """
+    vectors, cache = await asyncio.gather(
+        vector_store.delete_document_vectors(document_id, point_ids),
+        vector_store.invalidate_cached_responses(document_id),
+        return_exceptions=True,
+    )
+    if isinstance(vectors, Exception):
+        # Chat and search read chunk content straight from Qdrant payloads, so
+        # leftover vectors keep the document answerable. Retry by document_id,
+        # which also catches points whose ids never reached SQL.
+        try:
+            await vector_store.delete_document_vectors(document_id)
+        except Exception as e:
+            logger.error(
+                f"Failed to delete vectors for document {document_id}, which "
+                f"stay searchable until deleted by document_id: {e!s}"
+            )
+    if isinstance(cache, Exception):
+        try:
+            await vector_store.invalidate_cached_responses(document_id)
+        except Exception as e:
+            logger.error(
+                f"Failed to invalidate cached responses citing document "
+                f"{document_id}: {e!s}"
+            )
+
+
+def _encode_cursor(created_at: datetime, document_id: uuid.UUID) -> str:
+    """Encode a keyset position as an opaque, URL-safe cursor."""
+    raw = f"{created_at.isoformat()}|{document_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Decode a cursor from _encode_cursor, rejecting malformed ones with a 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, document_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(document_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
 
 
 @router.get("/", response_model=list[DocumentResponse])
 async def list_documents(
-    skip: int = 0, limit: int = 100, db: AsyncSession = Depends(get_db)
+    *,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
 ) -> Sequence[Document]:
+    """
+    List documents, newest first.
+
+    Pass the X-Next-Cursor header of a page back as cursor to fetch the next
+    one; unlike skip, this seeks the index instead of scanning past earlier
+    rows. Cursors are URL-safe and can be sent as-is.
+    """
+    position = _decode_cursor(cursor) if cursor is not None else None
     try:
         stmt = (
             select(Document)
-            .order_by(Document.created_at.desc())
-            .offset(skip)
+            .order_by(Document.created_at.desc(), Document.id.desc())
             .limit(limit)
         )
+        if position is not None:
+            stmt = stmt.where(tuple_(Document.created_at, Document.id) < position)
+        else:
+            stmt = stmt.offset(skip)
+
         result = await db.execute(stmt)
-        return result.scalars().all()
+        documents = result.scalars().all()
+
+        if documents and len(documents) == limit and documents[-1].created_at:
+            response.headers["X-Next-Cursor"] = _encode_cursor(
+                documents[-1].created_at, documents[-1].id
+            )
+
+        return documents
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
@@ -59,20 +138,27 @@ async def delete_document(
     vector_store: VectorStore = Depends(get_vector_store),
 ) -> dict[str, str]:
     try:
-        # Get document
-        stmt = select(Document).where(Document.id == document_id)
-        result = await db.execute(stmt)
-        document = result.scalar_one_or_none()
+        # Delete from SQL DB, collecting the chunks' point ids so the vectors
+        # can be deleted by id rather than by a filter scan
+        vector_ids: ScalarResult[str | None] = await db.scalars(
+            delete(Chunk)
+            .where(Chunk.document_id == document_id)
+            .returning(Chunk.vector_id)
+        )
+        point_ids = [vector_id for vector_id in vector_ids if vector_id]
+        deleted_id: uuid.UUID | None = await db.scalar(
+            delete(Document).where(Document.id == document_id).returning(Document.id)
+        )
 
-        if not document:
+        if deleted_id is None:
             raise HTTPException(status_code=404, detail="Document not found")
 
-        # Delete from Vector DB
-        await vector_store.delete_document_vectors(str(document_id))
-
-        # Delete from SQL DB
-        await db.delete(document)
-        await db.commit()
+        # Delete from Vector DB while the SQL delete commits
+        await asyncio.gather(
+            _delete_document_vectors(vector_store, str(document_id), point_ids),
+            db.commit(),
+        )
+        clear_response_cache()
 
         return {"message": "Document deleted successfully"}
 
@@ -1,12 +1,16 @@
+import asyncio
 import logging
 import os
-import shutil
 import uuid
 from pathlib import Path
+from typing import Any
 
+import aiofiles
+import numpy as np
+import numpy.typing as npt
 from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, UploadFile
 from qdrant_client.models import PointStruct
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.dependencies import (
@@ -14,6 +18,7 @@ from app.api.dependencies import (
     get_gemini_client,
     get_vector_store,
 )
+from app.api.routes.chat import clear_response_cache
 from app.config import settings
 from app.core.database import AsyncSessionLocal, get_db
 from app.models.api import DocumentResponse
@@ -30,6 +35,64 @@ from app.utils.validators import (
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+def _build_chunk_records(
+    document_id: uuid.UUID,
+    chunks: list[dict[str, Any]],
+    embeddings: npt.NDArray[np.float32],
+) -> tuple[list[PointStruct], list[dict[str, Any]]]:
+    """Pair chunks with their embeddings as Qdrant points and SQL rows."""
+    points = []
+    chunk_rows = []
+
+    for chunk, embedding in zip(chunks, embeddings, strict=True):
+        chunk_id = uuid.uuid4()
+        vector_id = str(chunk_id)
+
+        # Create Qdrant point
+        points.append(
+            PointStruct(
+                id=vector_id,
+                vector=embedding.tolist(),
+                payload={
+                    "document_id": str(document_id),
+                    "content": chunk["content"],
+                    "metadata": chunk["metadata"],
+                    "chunk_index": chunk["chunk_index"],
+                },
+            )
+        )
+
+        # Plain row for the bulk INSERT (no ORM object/identity map overhead)
+        chunk_rows.append(
+            {
+                "id": chunk_id,
+                "document_id": document_id,
+                "chunk_index": chunk["chunk_index"],
+                "content": chunk["content"],
+                "metadata_": chunk["metadata"],
+                "vector_id": vector_id,
+            }
+        )
+
+    return points, chunk_rows
+
+
+async def _store_chunk_records(
+    db: AsyncSession,
+    vector_store: VectorStore,
+    points: list[PointStruct],
+    chunk_rows: list[dict[str, Any]],
+    *,
+    wait: bool,
+) -> None:
+    """Write one window of chunks to Qdrant and Postgres concurrently."""
+    await asyncio.gather(
+        vector_store.upsert_vectors(points, wait=wait),
+        db.execute(insert(Chunk), chunk_rows),
+    )
 
 
 async def process_document_background(
@@ -43,63 +106,44 @@ async def process_document_background(
 ) -> None:
     async with AsyncSessionLocal() as db:
         try:
-            # Create a mock file object or modify processor to take path + metadata
-            # For now, let's create a simple object that mimics UploadFile
-            class MockFile(UploadFile):
-                def __init__(self, filename: str, content_type: str) -> None:
-                    self.filename = filename
-                    self.content_type = content_type
-
-            mock_file = MockFile(filename, content_type)
-
             # 1. Process file to get chunks
-            chunks_data = await document_processor.process_file(mock_file, file_path)
-
-            # 2. Generate embeddings and prepare vectors
-            points = []
-            db_chunks = []
-
-            for chunk in chunks_data:
-                # Generate embedding
-                embedding = await gemini_client.get_embeddings(chunk["content"])
-
-                chunk_id = uuid.uuid4()
-                vector_id = str(chunk_id)
-
-                # Create Qdrant point
-                points.append(
-                    PointStruct(
-                        id=vector_id,
-                        vector=embedding,
-                        payload={
-                            "document_id": str(document_id),
-                            "content": chunk["content"],
-                            "metadata": chunk["metadata"],
-                            "chunk_index": chunk["chunk_index"],
-                        },
+            chunks_data = await document_processor.process_path(
+                file_path, filename, content_type
+            )
+
+            # 2. Embed and store chunks window by window. Each window's
+            # vector/SQL writes run while the next window is being embedded.
+            store_task: asyncio.Task[None] | None = None
+            try:
+                for start in range(0, len(chunks_data), settings.INGEST_BATCH_SIZE):
+                    window = chunks_data[start : start + settings.INGEST_BATCH_SIZE]
+                    embeddings = await gemini_client.get_embeddings_batch(
+                        [chunk["content"] for chunk in window]
                     )
-                )
-
-                # Create DB chunk
-                db_chunks.append(
-                    Chunk(
-                        id=chunk_id,
-                        document_id=document_id,
-                        chunk_index=chunk["chunk_index"],
-                        content=chunk["content"],
-                        metadata_=chunk["metadata"],
-                        vector_id=vector_id,
+                    points, chunk_rows = _build_chunk_records(
+                        document_id, window, embeddings
                     )
-                )
 
-            # 3. Store in Vector DB
-            if points:
-                await vector_store.upsert_vectors(points)
+                    if store_task is not None:
+                        await store_task
+                    # Only the last window waits for Qdrant to apply its
+                    # points, which flushes the earlier ones before the commit
+                    last = start + settings.INGEST_BATCH_SIZE >= len(chunks_data)
+                    store_task = asyncio.create_task(
+                        _store_chunk_records(
+                            db, vector_store, points, chunk_rows, wait=last
+                        )
+                    )
 
-            # 4. Store in SQL DB
-            db.add_all(db_chunks)
+                if store_task is not None:
+                    await store_task
+            finally:
+                # An upsert already handed to a thread can't be cancelled, so let
+                # the in-flight window finish before the failure path cleans up
+                if store_task is not None and not store_task.done():
+                    await asyncio.gather(store_task, return_exceptions=True)
 
-            # 5. Update document status
+            # 3. Update document status
             stmt = select(Document).where(Document.id == document_id)
             result = await db.execute(stmt)
             document = result.scalar_one()
@@ -109,8 +153,23 @@ async def process_document_background(
 
             await db.commit()
 
+            # 4. Drop cached answers, which were generated without this document
+            clear_response_cache()
+            try:
+                await vector_store.clear_cached_responses()
+            except Exception as e:
+                logger.warning(f"Failed to clear cached responses: {e!s}")
+
         except Exception as e:
             logger.error(f"Error processing document {document_id}: {e!s}")
+            # Discard the chunk rows, and the vectors of the windows already
+            # upserted, which would otherwise still be searchable
+            try:
+                await vector_store.delete_document_vectors(str(document_id))
+            except Exception as e:
+                logger.error(f"Failed to delete vectors of {document_id}: {e!s}")
+            await db.rollback()
+
             # Update document status to failed
             try:
                 stmt = select(Document).where(Document.id == document_id)
@@ -164,13 +223,14 @@ async def upload_file(
     file_path = upload_dir / f"{file_id}.{ext}"
 
     try:
-        # Save file
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-
-        # Validate file size after saving
-        file_size = file_path.stat().st_size
-        validate_file_size(file_size)
+        # Stream file to disk without blocking the event loop, rejecting
+        # oversize uploads as soon as they cross the limit
+        file_size = 0
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                validate_file_size(file_size)
+                await buffer.write(chunk)
 
         # Create document record
         document = Document(
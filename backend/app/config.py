@@ -1,4 +1,4 @@
-from typing import ClassVar
+from typing import ClassVar, Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -17,6 +17,10 @@ class Settings(BaseSettings):
     GEMINI_EMBEDDING_MODEL: str = "text-embedding-004"
     GEMINI_TEMPERATURE: float = 0.7
     GEMINI_MAX_TOKENS: int = 2048
+    GEMINI_BATCH_LIMIT: int = 100  # texts per batchEmbedContents request
+    GEMINI_EMBEDDING_CONCURRENCY: int = 32
+    GEMINI_EMBEDDING_MAX_IN_FLIGHT: int = 4  # concurrent batch requests
+    GEMINI_MAX_RETRIES: int = 3  # retries of rate-limited (429) requests
 
     # Database Configuration
     POSTGRES_USER: str
@@ -24,18 +28,47 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_HOST: str = "postgres"
     POSTGRES_PORT: int = 5432
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 40
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 500
 
     # Qdrant Configuration
     QDRANT_HOST: str = "qdrant"
     QDRANT_PORT: int = 6333
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_PREFER_GRPC: bool = True
     QDRANT_COLLECTION_NAME: str = "documents"
     QDRANT_VECTOR_SIZE: int = 768  # gemini-embedding-001 dimension
+    # "binary" is ~32x smaller and much faster to search on large collections;
+    # only applies when the collection is created
+    QDRANT_QUANTIZATION: Literal["scalar", "binary"] = "scalar"
+    QDRANT_RESCORE_OVERSAMPLING: float = 2.0
 
     # Application Configuration
     MAX_FILE_SIZE_MB: int = 50
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
+    CHUNKER: Literal["recursive", "fast"] = "recursive"
     TOP_K_RESULTS: int = 5
+    # "embedding" reranks by similarity to the query instead of prompting Gemini
+    RERANK_STRATEGY: Literal["llm", "embedding"] = "llm"
+    INGEST_BATCH_SIZE: int = 128
+    PDF_BACKEND: Literal["pymupdf", "pypdf", "pdfium"] = "pymupdf"
+
+    # Cache Configuration
+    QUERY_EMBEDDING_CACHE_SIZE: int = 4096
+    DOCUMENT_EMBEDDING_CACHE_SIZE: int = 8192
+    RESPONSE_CACHE_SIZE: int = 10_000
+    RESPONSE_CACHE_TTL_SECONDS: int = 600
+    RERANK_CACHE_SIZE: int = 50_000
+    RERANK_CACHE_TTL_SECONDS: int = 600
+    QUERY_EXPANSION_CACHE_SIZE: int = 4096
+    QUERY_EXPANSION_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_COLLECTION_NAME: str = "prompt_cache"
+    SEMANTIC_CACHE_THRESHOLD: float = 0.97
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
 
     # Security
     SECRET_KEY: str
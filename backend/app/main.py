@@ -5,10 +5,12 @@ from typing import Any
 
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 
 from app.api.routes import chat, documents, search, upload
 from app.config import settings
+from app.core.database import pool_stats
 from app.services.document_processor import DocumentProcessor
 from app.services.gemini_client import GeminiClient
 from app.services.vector_store import VectorStore
@@ -38,6 +40,11 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
             host=settings.QDRANT_HOST,
             port=settings.QDRANT_PORT,
             collection_name=settings.QDRANT_COLLECTION_NAME,
+            cache_collection_name=settings.SEMANTIC_CACHE_COLLECTION_NAME,
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
+            quantization=settings.QDRANT_QUANTIZATION,
+            rescore_oversampling=settings.QDRANT_RESCORE_OVERSAMPLING,
         )
         await vector_store.initialize()
         app.state.vector_store = vector_store
@@ -60,6 +67,8 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     logger.info("Shutting down...")
     if hasattr(app.state, "vector_store"):
         await app.state.vector_store.close()
+    if hasattr(app.state, "document_processor"):
+        app.state.document_processor.close()
 
 
 # Create FastAPI app
@@ -68,6 +77,7 @@ app = FastAPI(
     description="RAG system powered by Gemini 2.5",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -77,8 +87,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Compress larger JSON responses (chat answers with citations)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Include routers
 app.include_router(upload.router, prefix="/api/upload", tags=["upload"])
 app.include_router(search.router, prefix="/api/search", tags=["search"])
@@ -96,6 +110,11 @@ async def health_check() -> dict[str, Any]:
     vector_store_status = (
         "connected" if hasattr(app.state, "vector_store") else "disconnected"
     )
+    query_embedding_cache = (
+        app.state.gemini_client.cache_stats()
+        if hasattr(app.state, "gemini_client")
+        else {}
+    )
 
     return {
         "status": "healthy",
@@ -104,6 +123,8 @@ async def health_check() -> dict[str, Any]:
             "gemini": gemini_status,
             "vector_store": vector_store_status
         },
+        "caches": {"query_embeddings": query_embedding_cache},
+        "db_pool": pool_stats(),
     }
 
 
@@ -120,11 +141,26 @@ async def root() -> dict[str, Any]:
 
 # Error handlers
 @app.exception_handler(HTTPException)
-async def http_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+async def http_exception_handler(
+    request: Request, exc: HTTPException
+) -> ORJSONResponse:
+    return ORJSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
 
 
 @app.exception_handler(Exception)
-async def general_exception_handler(request: Request, exc: Exception) -> JSONResponse:
+async def general_exception_handler(request: Request, exc: Exception) -> ORJSONResponse:
     logger.error(f"Unhandled exception: {exc!s}")
-    return JSONResponse(status_code=500, content={"detail": "Internal server error"})
+    return ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    # uvloop and httptools ship with uvicorn[standard]
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",  # noqa: S104
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+    )
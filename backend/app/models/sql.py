@@ -8,9 +8,11 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    desc,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import DeclarativeBase, relationship
@@ -43,6 +45,11 @@ class Document(Base):
         "Chunk", back_populates="document", cascade="all, delete-orphan"
     )
 
+    __table_args__ = (
+        # Backs keyset pagination in list_documents
+        Index("idx_documents_created_at_id", created_at.desc(), desc("id")),
+    )
+
 
 class Chunk(Base):
     __tablename__ = "chunks"
@@ -1,53 +1,116 @@
+import asyncio
 import logging
-from pathlib import Path
+import mmap
+import multiprocessing
+import os
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from typing import Any
 
+import aiofiles
 import docx
+import pymupdf
 import pypdf
-from fastapi import UploadFile
+import pypdfium2
 
+from app.config import settings
 from app.services.gemini_client import GeminiClient
 from app.utils.chunking import ChunkingEngine
+from app.utils.validators import get_extension
 
 logger = logging.getLogger(__name__)
 
+# Pages extracted per process-pool task; smaller PDFs are extracted inline
+PDF_PAGES_PER_TASK = 16
+
+
+@contextmanager
+def _open_pypdf(file_path: str) -> Iterator[pypdf.PdfReader]:
+    """Read a PDF over a memory map; given a path, pypdf copies the whole file"""
+    with (
+        open(file_path, "rb") as file,
+        mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+    ):
+        yield pypdf.PdfReader(mapped)  # type: ignore[arg-type]
+
+
+def _count_pdf_pages(file_path: str, backend: str) -> int:
+    if backend == "pymupdf":
+        with pymupdf.open(file_path) as doc:  # type: ignore[no-untyped-call]
+            return len(doc)
+    if backend == "pdfium":
+        pdf = pypdfium2.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    with _open_pypdf(file_path) as reader:
+        return len(reader.pages)
+
+
+def _extract_pdf_pages(
+    file_path: str, start: int, stop: int, backend: str
+) -> list[str]:
+    """Extract the text of pages [start, stop); runs in a worker process"""
+    if backend == "pymupdf":
+        with pymupdf.open(file_path) as doc:  # type: ignore[no-untyped-call]
+            return [doc[i].get_text("text") for i in range(start, stop)]
+    if backend == "pdfium":
+        pdf = pypdfium2.PdfDocument(file_path)
+        try:
+            return [pdf[i].get_textpage().get_text_range() for i in range(start, stop)]
+        finally:
+            pdf.close()
+    with _open_pypdf(file_path) as reader:
+        return [reader.pages[i].extract_text() for i in range(start, stop)]
+
 
 class DocumentProcessor:
     def __init__(self, gemini_client: GeminiClient) -> None:
         self.chunking_engine = ChunkingEngine()
         self.gemini_client = gemini_client
+        self._pdf_executor: ProcessPoolExecutor | None = None
+
+    def close(self) -> None:
+        """Shut down the PDF extraction worker processes, if started"""
+        if self._pdf_executor is not None:
+            self._pdf_executor.shutdown(cancel_futures=True)
+            self._pdf_executor = None
 
-    async def process_file(
-        self, file: UploadFile, file_path: str
+    async def process_path(
+        self, file_path: str, filename: str, content_type: str
     ) -> list[dict[str, Any]]:
         """
-        Process a file and return a list of chunks with metadata.
+        Process a file on disk and return a list of chunks with metadata.
         """
-        filename = file.filename or "unknown"
-        extension = filename.split(".")[-1].lower() if "." in filename else "txt"
+        extension = get_extension(filename) or "txt"
 
         text_content = ""
 
         try:
             if extension == "pdf":
-                text_content = self._process_pdf(file_path)
+                text_content = await self._process_pdf(file_path)
             elif extension in ["docx", "doc"]:
-                text_content = self._process_docx(file_path)
+                text_content = await asyncio.to_thread(self._process_docx, file_path)
             elif extension == "txt":
-                text_content = self._process_txt(file_path)
+                text_content = await self._process_txt(file_path)
             elif extension in ["png", "jpg", "jpeg", "tiff"]:
                 # Read file bytes for image processing
-                file_bytes = Path(file_path).read_bytes()
-                mime_type = file.content_type or "image/jpeg"
+                async with aiofiles.open(file_path, "rb") as file:
+                    file_bytes = await file.read()
+                mime_type = content_type or "image/jpeg"
                 text_content = await self.gemini_client.extract_text_from_image(
                     file_bytes, mime_type
                 )
             else:
                 # Fallback for other text-based formats
-                text_content = self._process_txt(file_path)
+                text_content = await self._process_txt(file_path)
 
             # Chunk the text
-            chunks = self.chunking_engine.split_text(text_content)
+            chunks = await asyncio.to_thread(
+                self.chunking_engine.split_text, text_content
+            )
 
             # Create chunk objects
             processed_chunks = []
@@ -66,17 +129,45 @@ class DocumentProcessor:
             logger.error(f"Error processing file {filename}: {e!s}")
             raise
 
-    def _process_pdf(self, file_path: str) -> str:
-        text = ""
-        with Path(file_path).open("rb") as file:
-            reader = pypdf.PdfReader(file)
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-        return text
+    async def _process_pdf(self, file_path: str) -> str:
+        # Parsers hold the GIL, so page ranges are extracted in parallel processes
+        backend = settings.PDF_BACKEND
+        num_pages = await asyncio.to_thread(_count_pdf_pages, file_path, backend)
+        if num_pages <= PDF_PAGES_PER_TASK:
+            pages = await asyncio.to_thread(
+                _extract_pdf_pages, file_path, 0, num_pages, backend
+            )
+            return "\n".join(pages)
+
+        if self._pdf_executor is None:
+            # Forking a process that runs the event loop and client threads can
+            # copy held locks into the workers, so start them from a server
+            self._pdf_executor = ProcessPoolExecutor(
+                max_workers=os.cpu_count(),
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+
+        loop = asyncio.get_running_loop()
+        page_ranges = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self._pdf_executor,
+                    _extract_pdf_pages,
+                    file_path,
+                    start,
+                    min(start + PDF_PAGES_PER_TASK, num_pages),
+                    backend,
+                )
+                for start in range(0, num_pages, PDF_PAGES_PER_TASK)
+            )
+        )
+        return "\n".join(page for pages in page_ranges for page in pages)
 
     def _process_docx(self, file_path: str) -> str:
         doc = docx.Document(file_path)
         return "\n".join([paragraph.text for paragraph in doc.paragraphs])
 
-    def _process_txt(self, file_path: str) -> str:
-        return Path(file_path).read_text(encoding="utf-8", errors="ignore")
+    async def _process_txt(self, file_path: str) -> str:
+        async with aiofiles.open(file_path, encoding="utf-8", errors="ignore") as file:
+            text: str = await file.read()
+        return text
@@ -1,11 +1,45 @@
+import asyncio
+import hashlib
 import logging
+import random
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar, cast
 
 import google.generativeai as genai
+import numpy as np
+import numpy.typing as npt
+from cachetools import LRUCache, TTLCache
+from google.api_core import exceptions as google_exceptions
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Brackets the model sometimes wraps its score list in
+_SCORE_BRACKETS = str.maketrans("", "", "[]")
+
+
+def _retry_after_seconds(error: google_exceptions.GoogleAPICallError) -> float | None:
+    """Server-requested retry delay of a rate-limited call, if it sent one"""
+    # REST transport: Retry-After header
+    headers = getattr(error.response, "headers", None) or {}
+    retry_after = headers.get("Retry-After")
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            return None
+
+    # gRPC transport: google.rpc.RetryInfo error detail
+    for detail in error.details or ():
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return float(delay.seconds + delay.nanos / 1e9)
+    return None
+
 
 class GeminiClient:
     def __init__(self, api_key: str) -> None:
@@ -13,28 +47,238 @@ class GeminiClient:
         self.model = genai.GenerativeModel(settings.GEMINI_MODEL)  # type: ignore[attr-defined]
         self.embedding_model = settings.GEMINI_EMBEDDING_MODEL
 
-    async def get_embeddings(self, text: str) -> list[float]:
-        """Generate embeddings for a single text string"""
+        # LRU cache of query embeddings keyed by normalized query text
+        self._query_embedding_cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._query_embedding_cache_size = settings.QUERY_EMBEDDING_CACHE_SIZE
+        self.query_embedding_cache_hits = 0
+        self.query_embedding_cache_misses = 0
+
+        # Query expansions keyed by (kind, normalized query), with in-flight
+        # generations shared by concurrent callers
+        self._expansion_cache: TTLCache[tuple[str, str], Any] = TTLCache(
+            maxsize=settings.QUERY_EXPANSION_CACHE_SIZE,
+            ttl=settings.QUERY_EXPANSION_CACHE_TTL_SECONDS,
+        )
+        self._expansion_tasks: dict[tuple[str, str], asyncio.Future[Any]] = {}
+
+        # Document embeddings keyed by a digest of the chunk text, so
+        # re-ingested chunks skip the API
+        self._document_embedding_cache: LRUCache[bytes, npt.NDArray[np.float32]] = (
+            LRUCache(maxsize=settings.DOCUMENT_EMBEDDING_CACHE_SIZE)
+        )
+
+    @staticmethod
+    def _normalize_query(text: str) -> str:
+        return text.strip().lower()
+
+    def _get_cached_query_embedding(self, text: str) -> list[float] | None:
+        key = self._normalize_query(text)
+        embedding = self._query_embedding_cache.get(key)
+        if embedding is None:
+            self.query_embedding_cache_misses += 1
+            return None
+
+        self._query_embedding_cache.move_to_end(key)
+        self.query_embedding_cache_hits += 1
+        return embedding
+
+    def _cache_query_embedding(self, text: str, embedding: list[float]) -> None:
+        key = self._normalize_query(text)
+        self._query_embedding_cache[key] = embedding
+        self._query_embedding_cache.move_to_end(key)
+        while len(self._query_embedding_cache) > self._query_embedding_cache_size:
+            self._query_embedding_cache.popitem(last=False)
+
+    def cache_stats(self) -> dict[str, int]:
+        """Return query embedding cache statistics"""
+        return {
+            "size": len(self._query_embedding_cache),
+            "hits": self.query_embedding_cache_hits,
+            "misses": self.query_embedding_cache_misses,
+        }
+
+    async def _cached_expansion(
+        self, kind: str, query: str, generate: Callable[[], Awaitable[T]]
+    ) -> T:
+        """
+        Return a cached query expansion, generating it at most once at a time.
+        Failed generations are not cached.
+        """
+        key = (kind, self._normalize_query(query))
+        if key in self._expansion_cache:
+            return cast(T, self._expansion_cache[key])
+
+        task = self._expansion_tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(generate())
+            self._expansion_tasks[key] = task
+
+            def _finish(done: asyncio.Future[Any]) -> None:
+                self._expansion_tasks.pop(key, None)
+                if not done.cancelled() and done.exception() is None:
+                    self._expansion_cache[key] = done.result()
+
+            task.add_done_callback(_finish)
+
+        # Shield so one cancelled caller does not cancel the shared generation
+        return cast(T, await asyncio.shield(task))
+
+    async def _embed(self, content: str | list[str], task_type: str) -> Any:
+        """
+        Call the embedding API off the event loop and return the raw vectors.
+        Rate-limited calls are retried after the server's Retry-After delay
+        (or an exponential backoff), with jitter.
+        """
+        attempt = 0
+        while True:
+            try:
+                result = await asyncio.to_thread(
+                    genai.embed_content,  # type: ignore[attr-defined]
+                    model=self.embedding_model,
+                    content=content,
+                    task_type=task_type,
+                )
+                return result["embedding"]
+            except google_exceptions.TooManyRequests as e:
+                if attempt >= settings.GEMINI_MAX_RETRIES:
+                    raise
+                delay = _retry_after_seconds(e)
+                if delay is None:
+                    delay = float(2**attempt)
+                attempt += 1
+                logger.warning(f"Embedding request rate limited, retrying in {delay}s")
+                # Jitter keeps concurrent batches from retrying in lockstep
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))  # noqa: S311
+
+    async def _embed_each(self, texts: list[str], task_type: str) -> list[list[float]]:
+        """Embed texts with one request each, a bounded number at a time"""
+        semaphore = asyncio.Semaphore(settings.GEMINI_EMBEDDING_CONCURRENCY)
+
+        async def embed_one(text: str) -> list[float]:
+            async with semaphore:
+                embedding: list[float] = await self._embed(text, task_type)
+                return embedding
+
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(embed_one(text)) for text in texts]
+        return [task.result() for task in tasks]
+
+    async def get_embeddings(self, text: str) -> npt.NDArray[np.float32]:
+        """Generate a float32 embedding vector for a single text string"""
         try:
-            result = genai.embed_content(  # type: ignore[attr-defined]
-                model=self.embedding_model, content=text, task_type="retrieval_document"
+            return np.asarray(
+                await self._embed(text, "retrieval_document"), dtype=np.float32
             )
-            return result["embedding"]
         except Exception as e:
             logger.error(f"Failed to generate embeddings: {e!s}")
             raise
 
+    async def _embed_documents(
+        self, texts: list[str], batch_size: int
+    ) -> list[list[list[float]]]:
+        """Embed documents batch_size texts per request; returns the batches"""
+        # Batches are sent concurrently, a bounded number at a time
+        semaphore = asyncio.Semaphore(settings.GEMINI_EMBEDDING_MAX_IN_FLIGHT)
+
+        async def embed_batch(batch: list[str]) -> list[list[float]]:
+            async with semaphore:
+                try:
+                    vectors: list[list[float]] = await self._embed(
+                        batch, "retrieval_document"
+                    )
+                    return vectors
+                except google_exceptions.TooManyRequests:
+                    raise
+                except Exception as e:
+                    logger.warning(
+                        f"Batch embedding failed, embedding texts one by one: {e!s}"
+                    )
+                    return await self._embed_each(batch, "retrieval_document")
+
+        return await asyncio.gather(
+            *(
+                embed_batch(texts[start : start + batch_size])
+                for start in range(0, len(texts), batch_size)
+            )
+        )
+
+    async def get_embeddings_batch(
+        self, texts: list[str], batch_size: int | None = None
+    ) -> npt.NDArray[np.float32]:
+        """
+        Generate document embeddings for many texts, batch_size (default
+        GEMINI_BATCH_LIMIT) per request, as one float32 matrix with a row per text.
+        Texts embedded before (or repeated in the input) are requested once.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        digests = [
+            hashlib.blake2b(text.encode(), digest_size=16).digest() for text in texts
+        ]
+        vectors: dict[bytes, npt.NDArray[np.float32]] = {}
+        missing: dict[bytes, str] = {}
+        for digest, text in zip(digests, texts, strict=True):
+            cached = self._document_embedding_cache.get(digest)
+            if cached is not None:
+                vectors[digest] = cached
+            else:
+                missing.setdefault(digest, text)
+
+        try:
+            if missing:
+                batches = await self._embed_documents(
+                    list(missing.values()),
+                    batch_size or settings.GEMINI_BATCH_LIMIT,
+                )
+                fresh = np.concatenate(
+                    [np.asarray(batch, dtype=np.float32) for batch in batches]
+                )
+                for digest, vector in zip(missing, fresh, strict=True):
+                    vectors[digest] = vector
+                    self._document_embedding_cache[digest] = vector
+            return np.stack([vectors[digest] for digest in digests])
+        except Exception as e:
+            logger.error(f"Failed to generate batch embeddings: {e!s}")
+            raise
+
     async def get_query_embedding(self, text: str) -> list[float]:
         """Generate embeddings for a query"""
+        cached = self._get_cached_query_embedding(text)
+        if cached is not None:
+            return cached
+
         try:
-            result = genai.embed_content(  # type: ignore[attr-defined]
-                model=self.embedding_model, content=text, task_type="retrieval_query"
-            )
-            return result["embedding"]
+            embedding: list[float] = await self._embed(text, "retrieval_query")
         except Exception as e:
             logger.error(f"Failed to generate query embedding: {e!s}")
             raise
 
+        self._cache_query_embedding(text, embedding)
+        return embedding
+
+    async def get_query_embeddings_batch(self, texts: list[str]) -> list[list[float]]:
+        """Generate embeddings for several queries in a single request"""
+        cached = [self._get_cached_query_embedding(text) for text in texts]
+        missing = [text for text, emb in zip(texts, cached, strict=True) if emb is None]
+        if not missing:
+            return [emb for emb in cached if emb is not None]
+
+        try:
+            fresh: list[list[float]] = await self._embed(missing, "retrieval_query")
+        except Exception as e:
+            logger.warning(
+                f"Batch query embedding failed, falling back to single requests: {e!s}"
+            )
+            # Fallback: embed each query individually, still concurrently
+            fresh = await self._embed_each(missing, "retrieval_query")
+
+        for text, embedding in zip(missing, fresh, strict=True):
+            self._cache_query_embedding(text, embedding)
+
+        fresh_iter = iter(fresh)
+        return [emb if emb is not None else next(fresh_iter) for emb in cached]
+
     async def generate_content(self, prompt: str, context: str = "") -> str:
         """Generate content using Gemini"""
         try:
@@ -48,7 +292,7 @@ class GeminiClient:
             Answer:
             """
 
-            response = self.model.generate_content(full_prompt)
+            response = await asyncio.to_thread(self.model.generate_content, full_prompt)
             return str(response.text)
         except Exception as e:
             logger.error(f"Failed to generate content: {e!s}")
@@ -63,7 +307,9 @@ class GeminiClient:
                 "Extract all text from this image. Preserve formatting where possible."
             )
 
-            response = self.model.generate_content([prompt, image_part])
+            response = await asyncio.to_thread(
+                self.model.generate_content, [prompt, image_part]
+            )
             return str(response.text)
         except Exception as e:
             logger.error(f"Failed to extract text from image: {e!s}")
@@ -72,78 +318,94 @@ class GeminiClient:
     async def generate_multi_queries(self, query: str, n: int = 3) -> list[str]:
         """Generate multiple variations of a query for better retrieval coverage."""
         try:
-            prompt = (
-                f"You are an AI language model assistant. Your task is to generate {n} "
-                "different versions of the given user question to retrieve relevant "
-                "documents from a vector database. By generating multiple perspectives "
-                "on the user question, your goal is to help the user overcome some of "
-                "the limitations of the distance-based similarity search. Provide "
-                "these alternative questions separated by newlines. "
-                f"Original question: {query}"
+            return await self._cached_expansion(
+                f"multi:{n}", query, lambda: self._generate_multi_queries(query, n)
             )
-
-            response = self.model.generate_content(prompt)
-            # Split by newline and clean up
-            queries = [q.strip() for q in response.text.split("\n") if q.strip()]
-            # Limit to n queries just in case
-            return queries[:n]
         except Exception as e:
             logger.error(f"Failed to generate multi-queries: {e!s}")
             # Fallback to just the original query if generation fails
             return [query]
 
+    async def _generate_multi_queries(self, query: str, n: int) -> list[str]:
+        prompt = (
+            f"You are an AI language model assistant. Your task is to generate {n} "
+            "different versions of the given user question to retrieve relevant "
+            "documents from a vector database. By generating multiple perspectives "
+            "on the user question, your goal is to help the user overcome some of "
+            "the limitations of the distance-based similarity search. Provide "
+            "these alternative questions separated by newlines. "
+            f"Original question: {query}"
+        )
+
+        response = await asyncio.to_thread(self.model.generate_content, prompt)
+        # Split by newline and clean up
+        queries = [q.strip() for q in response.text.split("\n") if q.strip()]
+        # Limit to n queries just in case
+        return queries[:n]
+
     async def generate_step_back_query(self, query: str) -> str | None:
         """Generate a step-back (broader/abstract) question."""
         try:
-            prompt = (
-                "You are an expert at world knowledge. Your task is to step back and "
-                "paraphrase a question to a more abstract, easier to answer "
-                "question.\n\n"
-                f"Original Question: {query}\n"
-                "Step Back Question:"
+            return await self._cached_expansion(
+                "step_back", query, lambda: self._generate_step_back_query(query)
             )
-
-            response = self.model.generate_content(prompt)
-            return str(response.text.strip()) if response.text else None
         except Exception as e:
             logger.error(f"Failed to generate step-back query: {e!s}")
             return None
 
+    async def _generate_step_back_query(self, query: str) -> str | None:
+        prompt = (
+            "You are an expert at world knowledge. Your task is to step back and "
+            "paraphrase a question to a more abstract, easier to answer "
+            "question.\n\n"
+            f"Original Question: {query}\n"
+            "Step Back Question:"
+        )
+
+        response = await asyncio.to_thread(self.model.generate_content, prompt)
+        return str(response.text.strip()) if response.text else None
+
     async def generate_hypothetical_answer(self, query: str) -> str | None:
         """Generate a hypothetical answer to the query for HyDE retrieval."""
         try:
-            prompt = (
-                "Please write a passage to answer the question. The passage should be "
-                "a plausible answer to the question, even if you don't know the "
-                "specific facts. It will be used to retrieve relevant documents "
-                "based on semantic similarity.\n\n"
-                f"Question: {query}\n"
-                "Passage:"
+            return await self._cached_expansion(
+                "hyde", query, lambda: self._generate_hypothetical_answer(query)
             )
-
-            response = self.model.generate_content(prompt)
-            return str(response.text.strip()) if response.text else None
         except Exception as e:
             logger.error(f"Failed to generate hypothetical answer: {e!s}")
             return None
 
+    async def _generate_hypothetical_answer(self, query: str) -> str | None:
+        prompt = (
+            "Please write a passage to answer the question. The passage should be "
+            "a plausible answer to the question, even if you don't know the "
+            "specific facts. It will be used to retrieve relevant documents "
+            "based on semantic similarity.\n\n"
+            f"Question: {query}\n"
+            "Passage:"
+        )
+
+        response = await asyncio.to_thread(self.model.generate_content, prompt)
+        return str(response.text.strip()) if response.text else None
+
     async def rerank_documents(
         self, query: str, documents: list[str], top_n: int = 5
     ) -> list[tuple[int, float]]:
         """
         Rerank a list of documents based on their relevance to the query using Gemini.
         Returns a list of (original_index, relevance_score) tuples,
-        sorted by score descending.
+        sorted by score descending. Raises if Gemini fails or its scores
+        can't be parsed.
         """
         if not documents:
             return []
 
         try:
             # Construct a prompt for listwise ranking
-            doc_text = ""
-            for i, doc in enumerate(documents):
-                # Truncate doc to avoid token limits if necessary
-                doc_text += f"Document {i}:\n{doc[:1000]}...\n\n"
+            # Truncate docs to avoid token limits if necessary
+            doc_text = "".join(
+                f"Document {i}:\n{doc[:1000]}...\n\n" for i, doc in enumerate(documents)
+            )
 
             prompt = (
                 f"You are a relevance ranking assistant.\n"
@@ -160,34 +422,19 @@ class GeminiClient:
                 "Scores:"
             )
 
-            response = self.model.generate_content(prompt)
+            response = await asyncio.to_thread(self.model.generate_content, prompt)
             text = response.text.strip()
 
-            # Parse scores
-            try:
-                scores_str = text.split(",")
-                scores = []
-                for s in scores_str:
-                    clean_s = s.strip().replace("[", "").replace("]", "")
-                    if clean_s:
-                        scores.append(float(clean_s))
-
-                # Match scores to indices
-                ranked_results = []
-                for i in range(min(len(scores), len(documents))):
-                    ranked_results.append((i, scores[i]))
-
-                # Sort by score descending
-                ranked_results.sort(key=lambda x: x[1], reverse=True)
-
-                return ranked_results[:top_n]
-
-            except ValueError:
-                logger.error(f"Failed to parse reranking scores: {text}")
-                # Fallback: return original order with default scores
-                return [(i, 1.0 - (i * 0.01)) for i in range(len(documents))][:top_n]
+            # Parse scores (numpy converts the tokens and raises on bad ones)
+            tokens = text.translate(_SCORE_BRACKETS).split(",")
+            scores = np.array(
+                [token for token in tokens if token.strip()], dtype=np.float64
+            )[: len(documents)]
 
         except Exception as e:
             logger.error(f"Failed to rerank documents: {e!s}")
-            # Fallback: return original order
-            return [(i, 1.0) for i in range(len(documents))][:top_n]
+            raise
+
+        # Sort by score descending; ties keep document order
+        order = np.argsort(-scores, kind="stable")[:top_n]
+        return [(int(i), float(scores[i])) for i in order]
@@ -1,6 +1,12 @@
+import asyncio
 import logging
+import time
+import uuid
+from collections.abc import Callable
 from typing import Any
 
+import orjson
+from httpx import Request, Response
 from qdrant_client import QdrantClient, models
 from qdrant_client.http.models import (
     CollectionsResponse,
@@ -10,6 +16,18 @@ from qdrant_client.http.models import (
 
 logger = logging.getLogger(__name__)
 
+# Chunk payload keys that search results are built from
+SEARCH_PAYLOAD_FIELDS = ["document_id", "content", "metadata", "chunk_index"]
+
+
+def _orjson_responses(
+    request: Request, call_next: Callable[[Request], Response]
+) -> Response:
+    """Decode Qdrant REST responses with orjson instead of the stdlib json"""
+    response = call_next(request)
+    response.json = lambda **_: orjson.loads(response.content)  # type: ignore[method-assign]
+    return response
+
 
 class VectorStore:
     def __init__(
@@ -18,10 +36,45 @@ class VectorStore:
         port: int,
         collection_name: str,
         vector_size: int = 768,
+        cache_collection_name: str = "prompt_cache",
+        *,
+        grpc_port: int = 6334,
+        prefer_grpc: bool = False,
+        quantization: str = "scalar",
+        rescore_oversampling: float = 2.0,
     ) -> None:
-        self.client = QdrantClient(host=host, port=port)
+        # gRPC sends vectors as packed floats instead of JSON text
+        self.client = QdrantClient(
+            host=host, port=port, grpc_port=grpc_port, prefer_grpc=prefer_grpc
+        )
+        # Requests without a gRPC equivalent (or all, without gRPC) use REST
+        self.client.http.client.add_middleware(_orjson_responses)
         self.collection_name = collection_name
         self.vector_size = vector_size
+        self.cache_collection_name = cache_collection_name
+        self.quantization = quantization
+        # Search quantized vectors first, then rescore the oversampled
+        # candidates with the original vectors
+        self.search_params = models.SearchParams(
+            quantization=models.QuantizationSearchParams(
+                rescore=True, oversampling=rescore_oversampling
+            )
+        )
+
+    def _quantization_config(self) -> models.QuantizationConfig:
+        if self.quantization == "binary":
+            # Binary Quantization for 32x memory reduction
+            return models.BinaryQuantization(
+                binary=models.BinaryQuantizationConfig(always_ram=True)
+            )
+        # Scalar Quantization for 4x memory reduction
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True,
+            ),
+        )
 
     async def initialize(self) -> None:
         """Initialize the vector store collection if it doesn't exist"""
@@ -38,14 +91,7 @@ class VectorStore:
                     vectors_config=VectorParams(
                         size=self.vector_size, distance=Distance.COSINE
                     ),
-                    # Enable Scalar Quantization for 4x memory reduction
-                    quantization_config=models.ScalarQuantization(
-                        scalar=models.ScalarQuantizationConfig(
-                            type=models.ScalarType.INT8,
-                            quantile=0.99,
-                            always_ram=True,
-                        ),
-                    ),
+                    quantization_config=self._quantization_config(),
                     # HNSW Tuning for better recall
                     hnsw_config=models.HnswConfigDiff(
                         m=32,  # Increase links per node (default 16)
@@ -53,12 +99,13 @@ class VectorStore:
                     ),
                 )
 
-                # Create payload index for document_id to speed up filtering/deletion
-                self.client.create_payload_index(
-                    collection_name=self.collection_name,
-                    field_name="document_id",
-                    field_schema=models.PayloadSchemaType.KEYWORD,
-                )
+                # Create payload indexes for the fields searches filter on
+                for field_name in ("document_id", "metadata.source"):
+                    self.client.create_payload_index(
+                        collection_name=self.collection_name,
+                        field_name=field_name,
+                        field_schema=models.PayloadSchemaType.KEYWORD,
+                    )
 
                 logger.info(
                     f"Collection '{self.collection_name}' created successfully "
@@ -67,14 +114,55 @@ class VectorStore:
             else:
                 logger.info(f"Collection '{self.collection_name}' already exists")
 
+            cache_exists = any(
+                c.name == self.cache_collection_name for c in collections.collections
+            )
+            if not cache_exists:
+                logger.info(f"Creating collection '{self.cache_collection_name}'...")
+                self.client.create_collection(
+                    collection_name=self.cache_collection_name,
+                    vectors_config=VectorParams(
+                        size=self.vector_size, distance=Distance.COSINE
+                    ),
+                )
+
+                # Indexes backing the cache lookup and invalidation filters
+                for field_name, field_schema in (
+                    ("scope", models.PayloadSchemaType.KEYWORD),
+                    ("document_ids", models.PayloadSchemaType.KEYWORD),
+                    ("created_at", models.PayloadSchemaType.FLOAT),
+                ):
+                    self.client.create_payload_index(
+                        collection_name=self.cache_collection_name,
+                        field_name=field_name,
+                        field_schema=field_schema,
+                    )
+
         except Exception as e:
             logger.error(f"Failed to initialize vector store: {e!s}")
             raise
 
-    async def upsert_vectors(self, points: list[models.PointStruct]) -> None:
-        """Upsert vectors into the collection"""
+    async def upsert_vectors(
+        self,
+        points: list[models.PointStruct],
+        batch_size: int = 256,
+        *,
+        wait: bool = True,
+    ) -> None:
+        """
+        Upsert vectors into the collection, batch_size points per request.
+        Only the last request waits for the write to be applied, and only if
+        wait is set: Qdrant applies updates in order, so the earlier batches
+        (including those of earlier calls) are applied by then too.
+        """
         try:
-            self.client.upsert(collection_name=self.collection_name, points=points)
+            for start in range(0, len(points), batch_size):
+                await asyncio.to_thread(
+                    self.client.upsert,
+                    collection_name=self.collection_name,
+                    points=points[start : start + batch_size],
+                    wait=wait and start + batch_size >= len(points),
+                )
         except Exception as e:
             logger.error(f"Failed to upsert vectors: {e!s}")
             raise
@@ -99,6 +187,8 @@ class VectorStore:
                 query=query_vector,
                 limit=limit,
                 query_filter=query_filter,
+                search_params=self.search_params,
+                with_payload=SEARCH_PAYLOAD_FIELDS,
             )
             return response.points
         except Exception as e:
@@ -110,6 +200,7 @@ class VectorStore:
         query_vectors: list[list[float]],
         limit: int = 5,
         filter_conditions: dict[str, Any] | None = None,
+        with_vectors: bool = False,
     ) -> list[list[models.ScoredPoint]]:
         """
         Search for similar vectors for multiple queries in a single batch request.
@@ -126,6 +217,9 @@ class VectorStore:
                     query=qv,
                     limit=limit,
                     filter=filter_obj,
+                    params=self.search_params,
+                    with_payload=SEARCH_PAYLOAD_FIELDS,
+                    with_vector=with_vectors,
                 )
                 for qv in query_vectors
             ]
@@ -143,16 +237,143 @@ class VectorStore:
             logger.error(f"Failed to batch search vectors: {e!s}")
             raise
 
-    async def delete_document_vectors(self, document_id: str) -> None:
-        """Delete all vectors associated with a document"""
+    async def delete_document_vectors(
+        self, document_id: str, point_ids: list[str] | None = None
+    ) -> None:
+        """
+        Delete all vectors associated with a document. Known point ids are
+        deleted directly; otherwise the points are found by document_id.
+        """
+        points_selector: models.PointIdsList | models.FilterSelector
+        if point_ids:
+            points_selector = models.PointIdsList(points=list(point_ids))
+        else:
+            points_selector = models.FilterSelector(
+                filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="document_id",
+                            match=models.MatchValue(value=document_id),
+                        )
+                    ]
+                )
+            )
+
         try:
-            self.client.delete(
+            await asyncio.to_thread(
+                self.client.delete,
                 collection_name=self.collection_name,
+                points_selector=points_selector,
+            )
+        except Exception as e:
+            logger.error(f"Failed to delete document vectors: {e!s}")
+            raise
+
+    async def search_cached_response(
+        self,
+        query_vector: list[float],
+        scope: str,
+        score_threshold: float,
+        max_age_seconds: int,
+    ) -> dict[str, Any] | None:
+        """
+        Look up a cached chat response whose prompt embedding is similar enough
+        to the query vector. Returns the stored response payload or None.
+        """
+        try:
+            response = await asyncio.to_thread(
+                self.client.query_points,
+                collection_name=self.cache_collection_name,
+                query=query_vector,
+                limit=1,
+                score_threshold=score_threshold,
+                query_filter=models.Filter(
+                    must=[
+                        models.FieldCondition(
+                            key="scope", match=models.MatchValue(value=scope)
+                        ),
+                        models.FieldCondition(
+                            key="created_at",
+                            range=models.Range(gte=time.time() - max_age_seconds),
+                        ),
+                    ]
+                ),
+                with_payload=["response"],
+            )
+            if not response.points:
+                return None
+
+            payload = response.points[0].payload or {}
+            cached: dict[str, Any] | None = payload.get("response")
+            return cached
+        except Exception as e:
+            logger.error(f"Failed to search cached responses: {e!s}")
+            raise
+
+    async def cache_response(
+        self,
+        query_vector: list[float],
+        scope: str,
+        response: dict[str, Any],
+        document_ids: list[str],
+        *,
+        key: str,
+        max_age_seconds: int,
+    ) -> None:
+        """
+        Store a chat response keyed by its prompt embedding. Repeats of the same
+        key overwrite their entry, and entries older than max_age_seconds are
+        purged so the collection doesn't grow without bound.
+        """
+        now = time.time()
+        try:
+            await asyncio.to_thread(
+                self.client.upsert,
+                collection_name=self.cache_collection_name,
+                points=[
+                    models.PointStruct(
+                        id=str(uuid.uuid5(uuid.NAMESPACE_OID, key)),
+                        vector=query_vector,
+                        payload={
+                            "scope": scope,
+                            "response": response,
+                            "document_ids": document_ids,
+                            "created_at": now,
+                        },
+                    )
+                ],
+                wait=False,
+            )
+            await asyncio.to_thread(
+                self.client.delete,
+                collection_name=self.cache_collection_name,
                 points_selector=models.FilterSelector(
                     filter=models.Filter(
                         must=[
                             models.FieldCondition(
-                                key="document_id",
+                                key="created_at",
+                                range=models.Range(lt=now - max_age_seconds),
+                            )
+                        ]
+                    )
+                ),
+                wait=False,
+            )
+        except Exception as e:
+            logger.error(f"Failed to cache response: {e!s}")
+            raise
+
+    async def invalidate_cached_responses(self, document_id: str) -> None:
+        """Drop cached chat responses that cite the given document"""
+        try:
+            await asyncio.to_thread(
+                self.client.delete,
+                collection_name=self.cache_collection_name,
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(
+                        must=[
+                            models.FieldCondition(
+                                key="document_ids",
                                 match=models.MatchValue(value=document_id),
                             )
                         ]
@@ -160,7 +381,19 @@ class VectorStore:
                 ),
             )
         except Exception as e:
-            logger.error(f"Failed to delete document vectors: {e!s}")
+            logger.error(f"Failed to invalidate cached responses: {e!s}")
+            raise
+
+    async def clear_cached_responses(self) -> None:
+        """Drop all cached chat responses (e.g. after new documents are added)"""
+        try:
+            await asyncio.to_thread(
+                self.client.delete,
+                collection_name=self.cache_collection_name,
+                points_selector=models.FilterSelector(filter=models.Filter()),
+            )
+        except Exception as e:
+            logger.error(f"Failed to clear cached responses: {e!s}")
             raise
 
     async def close(self) -> None:
@@ -1,15 +1,127 @@
+import logging
+from collections import deque
+from collections.abc import Iterable
+
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+class _RecursiveSplitter(RecursiveCharacterTextSplitter):
+    """
+    RecursiveCharacterTextSplitter with a cheaper merge step. The base class
+    re-measures each piece it drops from the sliding window and drops it by
+    copying the window list; here lengths are measured once and pieces are
+    popped from a deque. Produces the same chunks.
+    """
+
+    def _merge_splits(self, splits: Iterable[str], separator: str) -> list[str]:
+        separator_len = self._length_function(separator)
+
+        docs: list[str] = []
+        current_doc: deque[str] = deque()
+        current_lens: deque[int] = deque()
+        total = 0
+        for d in splits:
+            len_ = self._length_function(d)
+            if total + len_ + (separator_len if current_doc else 0) > self._chunk_size:
+                if total > self._chunk_size:
+                    logger.warning(
+                        f"Created a chunk of size {total}, which is longer than "
+                        f"the specified {self._chunk_size}"
+                    )
+                if current_doc:
+                    doc = self._join_docs(list(current_doc), separator)
+                    if doc is not None:
+                        docs.append(doc)
+                    # Slide the window until it fits the overlap and the next piece
+                    while total > self._chunk_overlap or (
+                        total + len_ + (separator_len if current_doc else 0)
+                        > self._chunk_size
+                        and total > 0
+                    ):
+                        total -= current_lens.popleft() + (
+                            separator_len if len(current_doc) > 1 else 0
+                        )
+                        current_doc.popleft()
+            current_doc.append(d)
+            current_lens.append(len_)
+            total += len_ + (separator_len if len(current_doc) > 1 else 0)
+        doc = self._join_docs(list(current_doc), separator)
+        if doc is not None:
+            docs.append(doc)
+        return docs
+
+
+class FastChunker:
+    """
+    Single-pass chunker. Each chunk ends at the last paragraph, line or word
+    break in the second half of its chunk_size window (or at chunk_size if
+    there is none), and the next chunk starts chunk_overlap characters before
+    that, moved forward to the next word. Chunks are close to, but not the
+    same as, the recursive splitter's.
+    """
+
+    SEPARATORS = ("\n\n", "\n", " ")
+
+    def __init__(self, chunk_size: int, chunk_overlap: int) -> None:
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    def split_text(self, text: str) -> list[str]:
+        """Split text into chunks"""
+        chunks: list[str] = []
+        length = len(text)
+        start = 0
+        while start < length:
+            end = start + self.chunk_size
+            cut = min(end, length)
+            if end < length:
+                for separator in self.SEPARATORS:
+                    pos = text.rfind(separator, start + self.chunk_size // 2, end)
+                    if pos != -1:
+                        cut = pos + len(separator)
+                        break
+
+            chunk = text[start:cut].strip()
+            if chunk:
+                chunks.append(chunk)
+            if cut >= length:
+                break
+
+            # Overlap with the previous chunk, without starting mid-word
+            next_start = max(cut - self.chunk_overlap, start + 1)
+            if next_start < cut and not text[next_start - 1].isspace():
+                breaks = [
+                    pos
+                    for pos in (
+                        text.find(" ", next_start, cut),
+                        text.find("\n", next_start, cut),
+                    )
+                    if pos != -1
+                ]
+                if breaks:
+                    next_start = min(breaks) + 1
+            start = next_start
+        return chunks
+
+
+# Shared by all ChunkingEngine instances; splitting keeps no per-call state
+_text_splitter = _RecursiveSplitter(
+    chunk_size=settings.CHUNK_SIZE,
+    chunk_overlap=settings.CHUNK_OVERLAP,
+    length_function=len,
+    separators=["\n\n", "\n", " ", ""],
+)
+_fast_chunker = FastChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP)
+
 
 class ChunkingEngine:
     def __init__(self) -> None:
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=settings.CHUNK_SIZE,
-            chunk_overlap=settings.CHUNK_OVERLAP,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""],
+        self.text_splitter: _RecursiveSplitter | FastChunker = (
+            _fast_chunker if settings.CHUNKER == "fast" else _text_splitter
         )
 
     def split_text(self, text: str) -> list[str]:
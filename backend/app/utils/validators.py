@@ -1,6 +1,6 @@
 """Input validation and sanitization utilities."""
 
-import re
+import os
 from pathlib import Path
 
 from fastapi import HTTPException, UploadFile
@@ -9,6 +9,34 @@ from app.config import settings
 
 MAX_FILENAME_LENGTH = 255
 
+# Replaces characters that are unsafe in filenames on common filesystems
+_UNSAFE_FILENAME_CHARS = str.maketrans(dict.fromkeys('<>:"/\\|?*', "_"))
+
+# Common MIME type mappings
+_MIME_TYPES: dict[str, frozenset[str]] = {
+    "pdf": frozenset({"application/pdf"}),
+    "docx": frozenset(
+        {"application/vnd.openxmlformats-officedocument.wordprocessingml.document"}
+    ),
+    "doc": frozenset({"application/msword"}),
+    "xlsx": frozenset(
+        {"application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
+    ),
+    "xls": frozenset({"application/vnd.ms-excel"}),
+    "pptx": frozenset(
+        {"application/vnd.openxmlformats-officedocument.presentationml.presentation"}
+    ),
+    "ppt": frozenset({"application/vnd.ms-powerpoint"}),
+    "txt": frozenset({"text/plain"}),
+    "md": frozenset({"text/markdown", "text/plain"}),
+    "html": frozenset({"text/html"}),
+    "png": frozenset({"image/png"}),
+    "jpg": frozenset({"image/jpeg"}),
+    "jpeg": frozenset({"image/jpeg"}),
+    "tiff": frozenset({"image/tiff"}),
+}
+
+
 class ValidationError(HTTPException):
     """Custom validation error."""
 
@@ -16,6 +44,18 @@ class ValidationError(HTTPException):
         super().__init__(status_code=400, detail=detail)
 
 
+def get_extension(filename: str) -> str:
+    """Return the lowercase file extension without the dot.
+
+    Args:
+        filename: Original filename
+
+    Returns:
+        Extension, or an empty string if the filename has none
+    """
+    return os.path.splitext(filename)[1][1:].lower()
+
+
 def validate_file_size(file_size: int, max_size_mb: int | None = None) -> None:
     """Validate file size is within limits.
 
@@ -52,7 +92,7 @@ def validate_file_extension(
         ValidationError: If extension is not allowed
     """
     allowed = allowed_extensions or settings.ALLOWED_EXTENSIONS
-    ext = filename.split(".")[-1].lower() if "." in filename else ""
+    ext = get_extension(filename)
 
     if not ext:
         msg = "File must have an extension"
@@ -78,29 +118,7 @@ def validate_mime_type(file: UploadFile, extension: str) -> None:
     if not file.content_type:
         return  # Skip if no content type provided
 
-    # Common MIME type mappings
-    mime_mappings = {
-        "pdf": ["application/pdf"],
-        "docx": [
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        ],
-        "doc": ["application/msword"],
-        "xlsx": ["application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"],
-        "xls": ["application/vnd.ms-excel"],
-        "pptx": [
-            "application/vnd.openxmlformats-officedocument.presentationml.presentation"
-        ],
-        "ppt": ["application/vnd.ms-powerpoint"],
-        "txt": ["text/plain"],
-        "md": ["text/markdown", "text/plain"],
-        "html": ["text/html"],
-        "png": ["image/png"],
-        "jpg": ["image/jpeg"],
-        "jpeg": ["image/jpeg"],
-        "tiff": ["image/tiff"],
-    }
-
-    expected_mimes = mime_mappings.get(extension, [])
+    expected_mimes = _MIME_TYPES.get(extension, frozenset())
     if expected_mimes and file.content_type not in expected_mimes:
         msg = f"MIME type '{file.content_type}' doesn't match extension '.{extension}'"
         raise ValidationError(msg)
@@ -119,7 +137,7 @@ def sanitize_filename(filename: str) -> str:
     filename = Path(filename).name
 
     # Remove or replace dangerous characters
-    filename = re.sub(r'[<>:"/\\|?*]', "_", filename)
+    filename = filename.translate(_UNSAFE_FILENAME_CHARS)
 
     # Remove leading/trailing dots and spaces
     filename = filename.strip(". ")
@@ -130,8 +148,8 @@ def sanitize_filename(filename: str) -> str:
 
     # Limit length
     if len(filename) > MAX_FILENAME_LENGTH:
-        name, ext = filename.rsplit(".", 1) if "." in filename else (filename, "")
-        filename = name[:250] + ("." + ext if ext else "")
+        name, ext = os.path.splitext(filename)
+        filename = name[:250] + ext
 
     return filename
 
@@ -0,0 +1,48 @@
+"""Lightweight async test doubles, cheaper to build and call than AsyncMock."""
+
+from typing import Any, NamedTuple
+
+
+class Call(NamedTuple):
+    args: tuple[Any, ...]
+    kwargs: dict[str, Any]
+
+
+class AStub:
+    """Async callable that records its calls and returns a canned value.
+
+    side_effect, if set, is called with the same arguments and its result
+    returned instead of return_value. Assert on calls directly, e.g.
+    ``stub.calls == [(("query",), {})]``.
+    """
+
+    def __init__(self, return_value: Any = None, side_effect: Any = None) -> None:
+        self.return_value = return_value
+        self.side_effect = side_effect
+        self.calls: list[Call] = []
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        self.calls.append(Call(args, kwargs))
+        if self.side_effect is not None:
+            return self.side_effect(*args, **kwargs)
+        return self.return_value
+
+    @property
+    def call_count(self) -> int:
+        return len(self.calls)
+
+    @property
+    def call_args(self) -> Call | None:
+        return self.calls[-1] if self.calls else None
+
+
+class SequenceStub(AStub):
+    """AStub that returns the given values in order, one per call."""
+
+    def __init__(self, *values: Any) -> None:
+        super().__init__()
+        self._values = values
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        self.calls.append(Call(args, kwargs))
+        return self._values[len(self.calls) - 1]
@@ -0,0 +1,97 @@
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from tests._stubs import AStub
+
+# App modules are imported inside the fixtures that need them, so selecting
+# only tests that don't (e.g. tests/test_chunking.py) skips loading FastAPI,
+# Qdrant and Gemini
+
+
+@pytest.fixture(autouse=True)
+def _clear_response_cache():
+    """Keep cached chat responses from leaking between tests."""
+    # Nothing can have been cached before the chat routes are imported
+    chat = sys.modules.get("app.api.routes.chat")
+    if chat is not None:
+        chat.clear_response_cache()
+    yield
+    chat = sys.modules.get("app.api.routes.chat")
+    if chat is not None:
+        chat.clear_response_cache()
+
+
+@pytest.fixture(scope="session")
+def patched_genai():
+    """Patch Gemini's GenerativeModel once for the whole test session."""
+    with patch("google.generativeai.GenerativeModel") as mock_model_cls:
+        yield mock_model_cls
+
+
+@pytest.fixture
+def mock_model(patched_genai):
+    """The patched model instance, with responses reset for each test."""
+    model = patched_genai.return_value
+    model.reset_mock(return_value=True, side_effect=True)
+    return model
+
+
+@pytest.fixture(scope="session")
+def _session_gemini_client(patched_genai):
+    """A GeminiClient backed by the patched model, built once per session."""
+    from app.services.gemini_client import GeminiClient
+
+    return GeminiClient(api_key="fake_key")
+
+
+@pytest.fixture
+def gemini_client(mock_model, _session_gemini_client):
+    """The shared GeminiClient, with its caches emptied for each test."""
+    client = _session_gemini_client
+    client._query_embedding_cache.clear()
+    client.query_embedding_cache_hits = client.query_embedding_cache_misses = 0
+    client._expansion_cache.clear()
+    client._document_embedding_cache.clear()
+    return client
+
+
+@pytest.fixture
+def chat_mocks():
+    """Factory for a (vector_store, gemini_client) pair of chat endpoint stubs.
+
+    Keyword arguments set what the stubs return; by default there is no
+    cached response, no query expansion and nothing is found.
+    """
+
+    def _make(
+        *,
+        cached_response=None,
+        search_results=((),),
+        multi_queries=(),
+        step_back=None,
+        hyde=None,
+        reranked=(),
+        answer="Answer",
+    ):
+        vector_store = SimpleNamespace(
+            search_cached_response=AStub(cached_response),
+            cache_response=AStub(),
+            search_batch=AStub(search_results),
+        )
+        gemini_client = SimpleNamespace(
+            get_query_embedding=AStub([0.1]),
+            generate_multi_queries=AStub(multi_queries),
+            generate_step_back_query=AStub(step_back),
+            generate_hypothetical_answer=AStub(hyde),
+            get_query_embeddings_batch=AStub(
+                side_effect=lambda texts: [[0.1]] * len(texts)
+            ),
+            rerank_documents=AStub(reranked),
+            generate_content=AStub(answer),
+        )
+        return vector_store, gemini_client
+
+    return _make
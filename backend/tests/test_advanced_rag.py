@@ -1,173 +1,418 @@
+import asyncio
+import uuid
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import MagicMock, patch
+
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
-from app.services.gemini_client import GeminiClient
-from app.api.routes.chat import chat_with_documents
+from google.api_core import exceptions as google_exceptions
+
+from app.api.routes.chat import (
+    _perform_search_and_fusion,
+    _rerank_by_similarity,
+    _rerank_results,
+    chat_with_documents,
+)
 from app.models.api import ChatRequest, ChatMessage
-from qdrant_client.models import ScoredPoint
-
-# Mock settings
-with patch("app.services.gemini_client.settings") as mock_settings:
-    mock_settings.GEMINI_MODEL = "gemini-2.5-flash"
-    mock_settings.GEMINI_EMBEDDING_MODEL = "text-embedding-004"
-    mock_settings.TOP_K_RESULTS = 5
-    # Oversampling means we expect limit=10
-
-@pytest.mark.asyncio
-async def test_gemini_client_query_generation():
-    # Mock the Google GenerativeAI model
-    with patch("google.generativeai.GenerativeModel") as MockModel:
-        mock_model_instance = MockModel.return_value
-        
-        # Test generate_multi_queries
-        mock_model_instance.generate_content.return_value.text = "Query 1\nQuery 2\nQuery 3"
-        
-        client = GeminiClient(api_key="fake_key")
-        queries = await client.generate_multi_queries("Original Query", n=3)
-        
-        assert len(queries) == 3
-        assert queries == ["Query 1", "Query 2", "Query 3"]
-        
-        # Test generate_step_back_query
-        mock_model_instance.generate_content.return_value.text = "Step Back Query"
-        
-        step_back = await client.generate_step_back_query("Original Query")
-        assert step_back == "Step Back Query"
-
-@pytest.mark.asyncio
-async def test_chat_with_documents_advanced_rag():
-    # Mock dependencies
-    mock_vector_store = AsyncMock()
-    mock_gemini_client = AsyncMock()
-    
-    # Setup mocks
-    mock_gemini_client.generate_multi_queries.return_value = ["Var 1", "Var 2"]
-    mock_gemini_client.generate_step_back_query.return_value = "Step Back"
-    mock_gemini_client.generate_hypothetical_answer.return_value = "Hypothetical Answer"
-    mock_gemini_client.get_query_embedding.return_value = [0.1, 0.2, 0.3]
-    mock_gemini_client.generate_content.return_value = "Final Answer"
-    
-    # Mock vector store search results
-    # We expect 1 batch search call with 5 queries (Original + 2 Vars + 1 Step Back + 1 HyDE)
-    
-    import uuid
-    doc_id1 = str(uuid.uuid4())
-    doc_id2 = str(uuid.uuid4())
-    chunk_id1 = str(uuid.uuid4())
-    chunk_id2 = str(uuid.uuid4())
-    
-    hit1 = ScoredPoint(id=chunk_id1, version=1, score=0.9, payload={"document_id": doc_id1, "content": "C1", "metadata": {"source": "S1"}}, vector=None)
-    hit2 = ScoredPoint(id=chunk_id2, version=1, score=0.8, payload={"document_id": doc_id2, "content": "C2", "metadata": {"source": "S2"}}, vector=None)
-    hit3 = ScoredPoint(id=chunk_id1, version=1, score=0.9, payload={"document_id": doc_id1, "content": "C1", "metadata": {"source": "S1"}}, vector=None) # Duplicate
-    
-    # search_batch returns a list of lists of hits
-    mock_vector_store.search_batch.return_value = [
-        [hit1], # Original
-        [hit2], # Var 1
-        [hit3], # Var 2 (Duplicate of hit1)
-        [],     # Step Back
-        []      # HyDE
+from tests._stubs import AStub
+
+# Deterministic ids; tests only need them to be distinct
+_UUID = [str(uuid.UUID(int=i)) for i in range(1, 10)]
+
+
+def _hit(
+    point_id: str,
+    score: float,
+    content: str,
+    vector: list[float] | None = None,
+    **payload: Any,
+) -> SimpleNamespace:
+    """A search hit; the chat code only reads these ScoredPoint attributes."""
+    return SimpleNamespace(
+        id=point_id,
+        version=1,
+        score=score,
+        payload={"content": content, **payload},
+        vector=vector,
+    )
+
+
+# Search hits shared by the chat tests
+_DOC_ID1, _DOC_ID2, _CHUNK_ID1, _CHUNK_ID2 = _UUID[:4]
+
+HIT1 = _hit(_CHUNK_ID1, 0.9, "C1", document_id=_DOC_ID1, metadata={"source": "S1"})
+HIT2 = _hit(_CHUNK_ID2, 0.8, "C2", document_id=_DOC_ID2, metadata={"source": "S2"})
+HIT_A = _hit(_UUID[4], 0.8, "Content A", document_id=_DOC_ID1)
+HIT_B = _hit(_UUID[5], 0.7, "Content B", document_id=_DOC_ID1)
+
+# Chat requests are read-only in the endpoint, so they are built once
+_REQ_COMPLEX = ChatRequest(messages=[ChatMessage(role="user", content="Complex Question")])
+_REQ_SIMPLE = ChatRequest(messages=[ChatMessage(role="user", content="Query")])
+_REQ_SIMPLE_PADDED = ChatRequest(messages=[ChatMessage(role="user", content=" query ")])
+
+async def test_gemini_client_query_generation(mock_model, gemini_client):
+    # One response each for generate_multi_queries and generate_step_back_query
+    mock_model.generate_content.side_effect = [
+        SimpleNamespace(text="Query 1\nQuery 2\nQuery 3"),
+        SimpleNamespace(text="Step Back Query"),
     ]
-    
-    # Mock re-ranking to return indices 0 and 1 (since we have 2 unique hits)
-    mock_gemini_client.rerank_documents.return_value = [(0, 0.95), (1, 0.85)]
-    
-    # Create request
-    request = ChatRequest(messages=[ChatMessage(role="user", content="Complex Question")])
-    
-    # Run function
+
+    queries = await gemini_client.generate_multi_queries("Original Query", n=3)
+
+    assert len(queries) == 3
+    assert queries == ["Query 1", "Query 2", "Query 3"]
+
+    step_back = await gemini_client.generate_step_back_query("Original Query")
+    assert step_back == "Step Back Query"
+
+# Stub results are immutable tuples, so every run shares them safely
+@pytest.mark.parametrize(
+    (
+        "chat_request",
+        "multi_queries",
+        "step_back",
+        "hyde",
+        "search_results",
+        "reranked",
+        "answer",
+        "num_queries",
+        "citations",
+    ),
+    [
+        # Original + 2 Vars + Step Back + HyDE; the Var 2 duplicate of HIT1 is fused away
+        pytest.param(
+            _REQ_COMPLEX, ("Var 1", "Var 2"), "Step Back", "Hypothetical Answer",
+            ((HIT1,), (HIT2,), (HIT1,), (), ()), ((0, 0.95), (1, 0.85)),
+            "Final Answer", 5, ["C1", "C2"],
+            id="advanced_rag",
+        ),
+        # Expansion failed and fell back to the original query alone
+        pytest.param(
+            _REQ_SIMPLE, ("Query",), None, None, ((),), (), "Answer", 1, [],
+            id="fallback",
+        ),
+        # No search results: the answer is generated from an empty context
+        pytest.param(
+            _REQ_SIMPLE, ("V1",), None, None, ((), ()), (), "I don't know", 2, [],
+            id="empty_results",
+        ),
+        # The reranker puts HIT_B ahead of HIT_A
+        pytest.param(
+            _REQ_SIMPLE, (), None, None, ((HIT_A, HIT_B),), ((1, 0.9), (0, 0.5)),
+            "Final Answer", 1, ["Content B", "Content A"],
+            id="reranking",
+        ),
+    ],
+)
+async def test_chat_with_documents(
+    chat_mocks,
+    chat_request,
+    multi_queries,
+    step_back,
+    hyde,
+    search_results,
+    reranked,
+    answer,
+    num_queries,
+    citations,
+):
+    """Test the chat pipeline: expansion, batch search, fusion, reranking and generation."""
+    mock_vector_store, mock_gemini_client = chat_mocks(
+        search_results=search_results,
+        multi_queries=multi_queries,
+        step_back=step_back,
+        hyde=hyde,
+        reranked=reranked,
+        answer=answer,
+    )
+
+    query = chat_request.messages[-1].content
+
     response = await chat_with_documents(
-        request=request,
+        request=chat_request,
         vector_store=mock_vector_store,
         gemini_client=mock_gemini_client
     )
-    
-    # Verify
-    assert response.response == "Final Answer"
-    
+
+    assert response.response == answer
+
     # Verify query generation calls
-    mock_gemini_client.generate_multi_queries.assert_called_once_with("Complex Question")
-    mock_gemini_client.generate_step_back_query.assert_called_once_with("Complex Question")
-    mock_gemini_client.generate_hypothetical_answer.assert_called_once_with("Complex Question")
-    
-    # Verify batch search call
-    mock_vector_store.search_batch.assert_called_once()
-    # Check that 5 queries were passed
-    call_args = mock_vector_store.search_batch.call_args
-    assert len(call_args.kwargs['query_vectors']) == 5
-    
-    # Verify deduplication in citations (Should be 2 unique hits: 1 and 2)
-    assert len(response.citations) == 2
-    ids = {str(c.chunk_id) for c in response.citations}
-    assert chunk_id1 in ids
-    assert chunk_id2 in ids
-
-@pytest.mark.asyncio
-async def test_gemini_client_fallback():
+    assert mock_gemini_client.generate_multi_queries.calls == [((query,), {})]
+    assert mock_gemini_client.generate_step_back_query.calls == [((query,), {})]
+    assert mock_gemini_client.generate_hypothetical_answer.calls == [((query,), {})]
+
+    # Verify one batch search over all unique queries
+    assert mock_vector_store.search_batch.call_count == 1
+    search_kwargs = mock_vector_store.search_batch.call_args.kwargs
+    assert len(search_kwargs["query_vectors"]) == num_queries
+
+    # Verify deduplicated, reranked citations
+    assert [c.content for c in response.citations] == citations
+    assert mock_gemini_client.rerank_documents.call_count == (1 if citations else 0)
+    if not citations:
+        assert mock_gemini_client.generate_content.calls == [
+            ((), {"prompt": query, "context": ""})
+        ]
+
+async def test_gemini_client_fallback(mock_model, gemini_client):
     """Test that GeminiClient falls back to original query on API error."""
-    with patch("google.generativeai.GenerativeModel") as MockModel:
-        mock_model_instance = MockModel.return_value
-        # Simulate API error
-        mock_model_instance.generate_content.side_effect = Exception("API Error")
-        
-        client = GeminiClient(api_key="fake_key")
-        
-        # Should return list containing just the original query
-        queries = await client.generate_multi_queries("Original Query", n=3)
-        assert queries == ["Original Query"]
-        
-        # Should return None for step-back
-        step_back = await client.generate_step_back_query("Original Query")
-        assert step_back is None
-
-@pytest.mark.asyncio
-async def test_chat_with_documents_fallback_handling():
-    """Test that chat endpoint handles the fallback (single query) correctly."""
-    mock_vector_store = AsyncMock()
-    mock_gemini_client = AsyncMock()
-    
-    # Simulate fallback behavior: generate_multi_queries returns just the original query
-    mock_gemini_client.generate_multi_queries.return_value = ["Query"]
-    # Step-back returns None
-    mock_gemini_client.generate_step_back_query.return_value = None
-    # HyDE returns None
-    mock_gemini_client.generate_hypothetical_answer.return_value = None
-    
-    mock_gemini_client.get_query_embedding.return_value = [0.1]
-    mock_gemini_client.generate_content.return_value = "Answer"
-    
-    mock_vector_store.search_batch.return_value = [[]]
-    
-    request = ChatRequest(messages=[ChatMessage(role="user", content="Query")])
-    
-    await chat_with_documents(request, mock_vector_store, mock_gemini_client)
-    
-    # Verify batch search was called exactly once (for "Query")
-    mock_vector_store.search_batch.assert_called_once()
-    call_args = mock_vector_store.search_batch.call_args
-    assert len(call_args.kwargs['query_vectors']) == 1
-    
-    # Verify we tried to generate multi-queries
-    mock_gemini_client.generate_multi_queries.assert_called_once()
-
-@pytest.mark.asyncio
-async def test_empty_search_results():
-    """Test handling of no search results."""
-    mock_vector_store = AsyncMock()
-    mock_gemini_client = AsyncMock()
-    
-    mock_gemini_client.generate_multi_queries.return_value = ["V1"]
-    mock_gemini_client.generate_step_back_query.return_value = None
-    mock_gemini_client.generate_hypothetical_answer.return_value = None
-    mock_gemini_client.get_query_embedding.return_value = [0.1]
-    mock_gemini_client.generate_content.return_value = "I don't know"
-    
-    # Always return empty list for all queries
-    mock_vector_store.search_batch.return_value = [[], []]
-    
-    request = ChatRequest(messages=[ChatMessage(role="user", content="Query")])
-    
-    response = await chat_with_documents(request, mock_vector_store, mock_gemini_client)
-    
-    assert response.citations == []
-    # Context should be empty string (or handled gracefully by Gemini prompt)
-    mock_gemini_client.generate_content.assert_called_with(prompt="Query", context="")
+    # Simulate API error
+    mock_model.generate_content.side_effect = Exception("API Error")
+
+    # Should return list containing just the original query
+    queries = await gemini_client.generate_multi_queries("Original Query", n=3)
+    assert queries == ["Original Query"]
+
+    # Should return None for step-back
+    step_back = await gemini_client.generate_step_back_query("Original Query")
+    assert step_back is None
+
+async def test_query_embeddings_batch_fallback(gemini_client):
+    """Test that batch embedding falls back to per-query requests on error."""
+    def fake_embed_content(model, content, task_type):
+        if isinstance(content, list):
+            raise Exception("Batch not supported")
+        return {"embedding": [float(len(content))]}
+
+    with patch("google.generativeai.embed_content", side_effect=fake_embed_content):
+        embeddings = await gemini_client.get_query_embeddings_batch(["a", "bb", "ccc"])
+        assert embeddings == [[1.0], [2.0], [3.0]]
+
+async def test_embeddings_batch_splits_requests(gemini_client):
+    """Test that document embeddings are requested batch_size texts at a time."""
+    def fake_embed_content(model, content, task_type):
+        return {"embedding": [[float(len(text))] for text in content]}
+
+    with patch(
+        "google.generativeai.embed_content", side_effect=fake_embed_content
+    ) as mock_embed:
+        texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+        embeddings = await gemini_client.get_embeddings_batch(texts, batch_size=2)
+
+        assert embeddings.tolist() == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+        assert mock_embed.call_count == 3
+
+async def test_query_embedding_cache(gemini_client):
+    """Test that repeated queries are served from the embedding cache."""
+    with patch(
+        "google.generativeai.embed_content",
+        return_value={"embedding": [0.5, 0.5]},
+    ) as mock_embed:
+        first = await gemini_client.get_query_embedding("What is RAG?")
+        second = await gemini_client.get_query_embedding("  what is rag?")
+
+        assert first == second == [0.5, 0.5]
+        assert mock_embed.call_count == 1
+        assert gemini_client.cache_stats() == {"size": 1, "hits": 1, "misses": 1}
+
+async def test_chat_semantic_cache_hit(chat_mocks):
+    """Test that a semantic cache hit skips the retrieval pipeline."""
+    mock_vector_store, mock_gemini_client = chat_mocks(cached_response={
+        "response": "Cached Answer",
+        "citations": [],
+        "processing_time_ms": 1234,
+    })
+
+    response = await chat_with_documents(_REQ_SIMPLE, mock_vector_store, mock_gemini_client)
+
+    assert response.response == "Cached Answer"
+    assert mock_gemini_client.generate_multi_queries.calls == []
+    assert mock_vector_store.search_batch.calls == []
+    assert mock_vector_store.cache_response.calls == []
+
+async def test_chat_response_cache_hit(chat_mocks):
+    """Test that an identical repeated prompt is answered from the response cache."""
+    mock_vector_store, mock_gemini_client = chat_mocks()
+
+    first = await chat_with_documents(
+        _REQ_SIMPLE,
+        mock_vector_store,
+        mock_gemini_client,
+    )
+    second = await chat_with_documents(
+        _REQ_SIMPLE_PADDED,
+        mock_vector_store,
+        mock_gemini_client,
+    )
+
+    assert first.response == second.response == "Answer"
+    assert mock_gemini_client.generate_content.call_count == 1
+    assert mock_vector_store.search_batch.call_count == 1
+
+
+async def test_rerank_scores_cached():
+    """Test that only chunks without a cached score are sent for reranking."""
+    mock_gemini_client = SimpleNamespace(rerank_documents=AStub([(0, 0.7)]))
+    hit1 = _hit(_UUID[0], 0.5, "C1")
+    hit2 = _hit(_UUID[1], 0.4, "C2")
+
+    await _rerank_results("Query", [hit1], mock_gemini_client, top_k=5)
+
+    mock_gemini_client.rerank_documents.return_value = [(0, 0.9)]
+    final_hits, _ = await _rerank_results(
+        "query", [hit1, hit2], mock_gemini_client, top_k=5
+    )
+
+    assert mock_gemini_client.rerank_documents.call_args == (
+        (), {"query": "query", "documents": ["C2"], "top_n": 1}
+    )
+    assert [h.id for h in final_hits] == [hit2.id, hit1.id]
+    assert [h.score for h in final_hits] == [0.9, 0.7]
+
+
+async def test_rerank_dedupes_identical_content():
+    """Test that chunks with identical content are reranked once and share the score."""
+    mock_gemini_client = SimpleNamespace(rerank_documents=AStub([(1, 0.9), (0, 0.6)]))
+    hit1 = _hit(_UUID[0], 0.5, "Same")
+    hit2 = _hit(_UUID[1], 0.4, "Other")
+    hit3 = _hit(_UUID[2], 0.3, "Same")
+
+    final_hits, _ = await _rerank_results(
+        "Query", [hit1, hit2, hit3], mock_gemini_client, top_k=5
+    )
+
+    assert mock_gemini_client.rerank_documents.calls == [
+        ((), {"query": "Query", "documents": ["Same", "Other"], "top_n": 2})
+    ]
+    assert [h.id for h in final_hits] == [hit2.id, hit1.id, hit3.id]
+    assert [h.score for h in final_hits] == [0.9, 0.6, 0.6]
+
+
+async def test_rerank_failure_not_cached() -> None:
+    """Test that a failed rerank keeps the search order and is retried next time."""
+
+    def rerank(**kwargs: object) -> list[tuple[int, float]]:
+        if mock_gemini_client.rerank_documents.call_count == 1:
+            msg = "quota"
+            raise RuntimeError(msg)
+        return [(1, 0.9), (0, 0.6)]
+
+    mock_gemini_client = SimpleNamespace(rerank_documents=AStub(side_effect=rerank))
+    hit1 = _hit(_UUID[0], 0.5, "C1")
+    hit2 = _hit(_UUID[1], 0.4, "C2")
+
+    hits = [hit1, hit2]
+    first, first_ok = await _rerank_results("Query", hits, mock_gemini_client, 5)
+    second, second_ok = await _rerank_results("Query", hits, mock_gemini_client, 5)
+
+    assert not first_ok
+    assert second_ok
+    assert [h.id for h in first] == [hit1.id, hit2.id]
+    assert mock_gemini_client.rerank_documents.calls == [
+        ((), {"query": "Query", "documents": ["C1", "C2"], "top_n": 2})
+    ] * 2
+    assert [h.id for h in second] == [hit2.id, hit1.id]
+    assert [h.score for h in second] == [0.9, 0.6]
+
+
+async def test_chat_rerank_failure_not_cached(chat_mocks) -> None:
+    """Test that an answer built on the fallback order is not cached."""
+    mock_vector_store, mock_gemini_client = chat_mocks(search_results=((HIT_A,),))
+
+    def rerank(**kwargs: object) -> list[tuple[int, float]]:
+        msg = "quota"
+        raise RuntimeError(msg)
+
+    mock_gemini_client.rerank_documents.side_effect = rerank
+
+    await chat_with_documents(_REQ_SIMPLE, mock_vector_store, mock_gemini_client)
+    await chat_with_documents(_REQ_SIMPLE, mock_vector_store, mock_gemini_client)
+
+    assert mock_gemini_client.generate_content.call_count == 2
+    assert mock_vector_store.cache_response.calls == []
+
+
+def test_rerank_by_similarity():
+    """Test that hits are reranked by cosine similarity to the query."""
+    hit1 = _hit(_UUID[0], 0.9, "C1", vector=[0.0, 1.0])
+    hit2 = _hit(_UUID[1], 0.8, "C2", vector=[2.0, 0.0])
+    hit3 = _hit(_UUID[2], 0.7, "C3", vector=[1.0, 1.0])
+
+    final_hits = _rerank_by_similarity([1.0, 0.0], [hit1, hit2, hit3], top_k=2)
+
+    assert [h.id for h in final_hits] == [hit2.id, hit3.id]
+    assert final_hits[0].score == pytest.approx(1.0)
+    assert final_hits[1].score == pytest.approx(0.5 ** 0.5)
+
+async def test_search_reuses_precomputed_embeddings():
+    """Test that queries with a precomputed embedding are not embedded again."""
+    mock_vector_store = SimpleNamespace(search_batch=AStub([[], []]))
+    mock_gemini_client = SimpleNamespace(get_query_embeddings_batch=AStub([[0.2]]))
+
+    await _perform_search_and_fusion(
+        ["Query", "Variant"],
+        mock_gemini_client,
+        mock_vector_store,
+        top_k=5,
+        precomputed={"Query": [0.1]},
+    )
+
+    assert mock_gemini_client.get_query_embeddings_batch.calls == [((["Variant"],), {})]
+    assert mock_vector_store.search_batch.calls == [
+        ((), {"query_vectors": [[0.1], [0.2]], "limit": 10, "with_vectors": False})
+    ]
+
+
+async def test_query_expansion_cache_single_flight(mock_model, gemini_client):
+    """Test that concurrent identical expansions share one call and failures are not cached."""
+    mock_model.generate_content.side_effect = [
+        RuntimeError("quota"),
+        MagicMock(text="Step Back Query"),
+    ]
+
+    assert await gemini_client.generate_step_back_query("Original Query") is None
+
+    results = await asyncio.gather(
+        gemini_client.generate_step_back_query("Original Query"),
+        gemini_client.generate_step_back_query("original query "),
+    )
+    assert results == ["Step Back Query", "Step Back Query"]
+    assert await gemini_client.generate_step_back_query("Original Query") == "Step Back Query"
+    assert mock_model.generate_content.call_count == 2
+
+
+async def test_embeddings_batch_fallback(gemini_client):
+    """Test that a failed document batch is embedded one text per request."""
+    def fake_embed_content(model, content, task_type):
+        if isinstance(content, list):
+            raise Exception("Batch not supported")
+        return {"embedding": [float(len(content))]}
+
+    with patch("google.generativeai.embed_content", side_effect=fake_embed_content):
+        embeddings = await gemini_client.get_embeddings_batch(["a", "bb", "ccc"], batch_size=2)
+        assert embeddings.tolist() == [[1.0], [2.0], [3.0]]
+
+
+async def test_embeddings_retry_rate_limited_batch(gemini_client):
+    """Test that a rate-limited batch is retried after Retry-After instead of split up."""
+    calls = []
+
+    def fake_embed_content(model, content, task_type):
+        calls.append(content)
+        if len(calls) == 1:
+            raise google_exceptions.TooManyRequests(
+                "slow down", response=MagicMock(headers={"Retry-After": "0"})
+            )
+        return {"embedding": [[float(len(text))] for text in content]}
+
+    with patch("google.generativeai.embed_content", side_effect=fake_embed_content):
+        embeddings = await gemini_client.get_embeddings_batch(["a", "bb"], batch_size=2)
+        assert embeddings.tolist() == [[1.0], [2.0]]
+        assert calls == [["a", "bb"], ["a", "bb"]]
+
+
+async def test_embeddings_batch_cached_by_text(gemini_client):
+    """Test that repeated and previously embedded texts are not re-requested."""
+    calls = []
+
+    def fake_embed_content(model, content, task_type):
+        calls.append(content)
+        return {"embedding": [[float(len(text))] for text in content]}
+
+    with patch("google.generativeai.embed_content", side_effect=fake_embed_content):
+        embeddings = await gemini_client.get_embeddings_batch(["a", "bb", "a"])
+        assert embeddings.tolist() == [[1.0], [2.0], [1.0]]
+
+        embeddings = await gemini_client.get_embeddings_batch(["bb", "ccc"])
+        assert embeddings.tolist() == [[2.0], [3.0]]
+        assert calls == [["a", "bb"], ["ccc"]]
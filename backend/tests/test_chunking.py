@@ -0,0 +1,37 @@
+import random
+
+import pytest
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.utils.chunking import FastChunker, _RecursiveSplitter
+
+
+@pytest.mark.parametrize(("chunk_size", "chunk_overlap"), [(20, 0), (50, 10), (100, 40)])
+def test_splitter_matches_langchain(chunk_size, chunk_overlap):
+    """Test that the optimized merge step produces the same chunks as langchain."""
+    rng = random.Random(chunk_size)
+    words = ["a", "bb", "lorem", "ipsum", "x" * 30, "y" * 150]
+    separators = [" ", " ", "\n", "\n\n", ""]
+    text = "".join(rng.choice(words) + rng.choice(separators) for _ in range(500))
+
+    kwargs = {
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "length_function": len,
+        "separators": ["\n\n", "\n", " ", ""],
+    }
+    expected = RecursiveCharacterTextSplitter(**kwargs).split_text(text)
+    assert _RecursiveSplitter(**kwargs).split_text(text) == expected
+
+
+def test_fast_chunker_respects_size_and_keeps_words():
+    """Test that FastChunker bounds chunk sizes and, without overlap, loses no words."""
+    text = "\n\n".join(" ".join(f"word{i}-{j}" for j in range(40)) for i in range(20))
+
+    chunks = FastChunker(chunk_size=100, chunk_overlap=0).split_text(text)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+    overlapping = FastChunker(chunk_size=100, chunk_overlap=30).split_text(text)
+    assert all(len(chunk) <= 100 for chunk in overlapping)
+    assert all(chunk.split()[0] in text.split() for chunk in overlapping)
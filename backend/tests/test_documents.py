@@ -0,0 +1,133 @@
+import uuid
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes import documents
+from app.api.routes.chat import _response_cache
+from app.api.routes.documents import _delete_document_vectors, delete_document
+from app.core.database import get_db
+from app.models.sql import Document
+from tests._stubs import AStub
+
+_DOC_ID = uuid.UUID(int=1)
+
+
+def _document(i: int) -> Document:
+    """The i-th newest of a set of listed documents."""
+    created_at = datetime(2026, 1, 1, tzinfo=UTC) - timedelta(minutes=i)
+    return Document(
+        id=uuid.UUID(int=100 + i),
+        filename=f"doc{i}.txt",
+        original_filename=f"doc{i}.txt",
+        file_type="txt",
+        file_size=1,
+        upload_date=created_at,
+        processed=True,
+        num_chunks=1,
+        created_at=created_at,
+        updated_at=created_at,
+    )
+
+
+async def test_delete_document() -> None:
+    """Test that deleting a document removes its chunks, vectors and cached answers."""
+    db = SimpleNamespace(
+        scalars=AStub(["v1", None, "v2"]),  # vector_id of each deleted chunk
+        scalar=AStub(_DOC_ID),
+        commit=AStub(),
+    )
+    vector_store = SimpleNamespace(
+        delete_document_vectors=AStub(),
+        invalidate_cached_responses=AStub(),
+    )
+    _response_cache["key"] = SimpleNamespace()
+
+    response = await delete_document(_DOC_ID, db, vector_store)
+
+    assert response == {"message": "Document deleted successfully"}
+
+    # Chunks are deleted in SQL first, returning their point ids
+    (chunk_delete,), _ = db.scalars.calls[0]
+    assert str(chunk_delete) == (
+        "DELETE FROM chunks WHERE chunks.document_id = :document_id_1 "
+        "RETURNING chunks.vector_id"
+    )
+    assert chunk_delete.compile().params == {"document_id_1": _DOC_ID}
+    (document_delete,), _ = db.scalar.calls[0]
+    assert str(document_delete) == (
+        "DELETE FROM documents WHERE documents.id = :id_1 RETURNING documents.id"
+    )
+    assert db.commit.call_count == 1
+
+    # Vectors are deleted by those ids, skipping chunks without one
+    assert vector_store.delete_document_vectors.calls == [
+        ((str(_DOC_ID), ["v1", "v2"]), {})
+    ]
+    assert vector_store.invalidate_cached_responses.calls == [((str(_DOC_ID),), {})]
+    assert "key" not in _response_cache
+
+
+async def test_delete_document_vectors_retries_by_filter() -> None:
+    """Test that a failed delete by point id is retried by document_id."""
+
+    def delete_vectors(document_id: str, point_ids: list[str] | None = None) -> None:
+        if point_ids:
+            msg = "timeout"
+            raise RuntimeError(msg)
+
+    vector_store = SimpleNamespace(
+        delete_document_vectors=AStub(side_effect=delete_vectors),
+        invalidate_cached_responses=AStub(),
+    )
+
+    await _delete_document_vectors(vector_store, str(_DOC_ID), ["v1", "v2"])
+
+    assert vector_store.delete_document_vectors.calls == [
+        ((str(_DOC_ID), ["v1", "v2"]), {}),
+        ((str(_DOC_ID),), {}),
+    ]
+    assert vector_store.invalidate_cached_responses.call_count == 1
+
+
+def test_list_documents_pages() -> None:
+    """Test that the next-page cursor can be passed back unencoded."""
+    docs = [_document(i) for i in range(3)]
+    pages = iter([docs[:2], docs[2:], []])
+    db = SimpleNamespace(
+        execute=AStub(
+            side_effect=lambda stmt: SimpleNamespace(
+                scalars=lambda: SimpleNamespace(all=lambda: next(pages))
+            )
+        )
+    )
+    app = FastAPI()
+    app.include_router(documents.router, prefix="/documents")
+    app.dependency_overrides[get_db] = lambda: db
+    client = TestClient(app)
+
+    first = client.get("/documents/?limit=2")
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(f"/documents/?limit=2&cursor={cursor}")
+
+    assert first.status_code == second.status_code == 200
+    assert [d["id"] for d in first.json()] == [str(docs[0].id), str(docs[1].id)]
+    assert [d["id"] for d in second.json()] == [str(docs[2].id)]
+    assert "X-Next-Cursor" not in second.headers
+    assert client.get("/documents/?cursor=bogus").status_code == 400
+
+    # An empty page has no next cursor, even when limit=0 matches its length
+    empty = client.get("/documents/?limit=0")
+    assert empty.status_code == 200
+    assert empty.json() == []
+    assert "X-Next-Cursor" not in empty.headers
+
+    # The second page seeks past the last document of the first
+    (stmt,), _ = db.execute.calls[1]
+    assert stmt.compile().params == {
+        "param_1": docs[1].created_at,
+        "param_2": docs[1].id,
+        "param_3": 2,
+    }
@@ -0,0 +1,151 @@
+import io
+import os
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from fastapi import UploadFile
+from starlette.datastructures import Headers
+
+from app.api.routes import upload
+from app.config import settings
+from app.utils.validators import ValidationError
+from tests._stubs import AStub
+
+
+async def test_upload_rejects_oversize_file(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """Test that an upload crossing the size limit is rejected and not kept on disk."""
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "MAX_FILE_SIZE_MB", 1)
+    # Exactly at the limit after the first piece, over it after the second
+    file = UploadFile(
+        io.BytesIO(b"x" * (upload.UPLOAD_CHUNK_SIZE + 1)),
+        filename="big.txt",
+        headers=Headers({"content-type": "text/plain"}),
+    )
+
+    with pytest.raises(ValidationError) as exc_info:
+        await upload.upload_file(
+            background_tasks=None,
+            file=file,
+            db=None,
+            vector_store=None,
+            gemini_client=None,
+            document_processor=None,
+        )
+
+    assert exc_info.value.status_code == 400
+    assert os.listdir(tmp_path) == []
+
+
+_CHUNKS = [{"chunk_index": i, "content": f"c{i}", "metadata": {}} for i in range(5)]
+
+
+def _embed_by_index(texts: list[str]) -> np.ndarray:
+    """Embed each chunk as its index, so points can be matched to chunks."""
+    return np.array([[float(text[1:])] for text in texts], dtype=np.float32)
+
+
+def _patch_session(monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """Make AsyncSessionLocal hand out a stub session over a pending document."""
+    document = SimpleNamespace(processed=False, num_chunks=0)
+    db = SimpleNamespace(
+        execute=AStub(SimpleNamespace(scalar_one=lambda: document)),
+        commit=AStub(),
+        rollback=AStub(),
+        document=document,
+    )
+
+    @asynccontextmanager
+    async def session() -> AsyncIterator[SimpleNamespace]:
+        yield db
+
+    monkeypatch.setattr(upload, "AsyncSessionLocal", session)
+    return db
+
+
+async def _ingest(
+    vector_store: SimpleNamespace, gemini_client: SimpleNamespace
+) -> None:
+    await upload.process_document_background(
+        uuid.UUID(int=1),
+        "/nonexistent/doc.txt",
+        "doc.txt",
+        "text/plain",
+        vector_store,
+        gemini_client,
+        SimpleNamespace(process_path=AStub(_CHUNKS)),
+    )
+
+
+async def test_ingest_stores_each_window_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that chunks spanning several windows are each stored once, in order."""
+    monkeypatch.setattr(settings, "INGEST_BATCH_SIZE", 2)
+    db = _patch_session(monkeypatch)
+    vector_store = SimpleNamespace(
+        upsert_vectors=AStub(), clear_cached_responses=AStub()
+    )
+    gemini_client = SimpleNamespace(
+        get_embeddings_batch=AStub(side_effect=_embed_by_index)
+    )
+
+    await _ingest(vector_store, gemini_client)
+
+    upserts = [call.args[0] for call in vector_store.upsert_vectors.calls]
+    points = [point for batch in upserts for point in batch]
+    rows = [
+        row for call in db.execute.calls if len(call.args) == 2 for row in call.args[1]
+    ]
+
+    assert [len(batch) for batch in upserts] == [2, 2, 1]
+    assert [call.kwargs for call in vector_store.upsert_vectors.calls] == [
+        {"wait": False},
+        {"wait": False},
+        {"wait": True},
+    ]
+    assert [point.payload["chunk_index"] for point in points] == list(range(5))
+    assert [point.vector for point in points] == [[float(i)] for i in range(5)]
+    assert [row["chunk_index"] for row in rows] == list(range(5))
+    assert [row["vector_id"] for row in rows] == [point.id for point in points]
+    assert db.document.processed is True
+    assert db.document.num_chunks == 5
+    assert vector_store.clear_cached_responses.call_count == 1
+
+
+async def test_failed_ingest_removes_stored_windows(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that an ingest failing after its first window leaves no vectors behind."""
+    monkeypatch.setattr(settings, "INGEST_BATCH_SIZE", 2)
+    db = _patch_session(monkeypatch)
+    events = []
+    vector_store = SimpleNamespace(
+        upsert_vectors=AStub(side_effect=lambda points, **_: events.append("upsert")),
+        delete_document_vectors=AStub(side_effect=lambda _: events.append("delete")),
+        clear_cached_responses=AStub(),
+    )
+
+    def embed(texts: list[str]) -> np.ndarray:
+        if gemini_client.get_embeddings_batch.call_count == 2:
+            msg = "quota"
+            raise RuntimeError(msg)
+        return _embed_by_index(texts)
+
+    gemini_client = SimpleNamespace(get_embeddings_batch=AStub(side_effect=embed))
+
+    await _ingest(vector_store, gemini_client)
+
+    # The first window's write finishes before its vectors are deleted
+    assert events == ["upsert", "delete"]
+    assert vector_store.delete_document_vectors.calls == [
+        ((str(uuid.UUID(int=1)),), {})
+    ]
+    assert db.rollback.call_count == 1
+    assert db.document.processed is False
+    assert vector_store.clear_cached_responses.calls == []
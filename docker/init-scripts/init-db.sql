@@ -38,6 +38,7 @@ CREATE TABLE IF NOT EXISTS queries (
 -- Create indexes
 CREATE INDEX idx_documents_filename ON documents(filename);
 CREATE INDEX idx_documents_upload_date ON documents(upload_date);
+CREATE INDEX idx_documents_created_at_id ON documents(created_at DESC, id DESC);
 CREATE INDEX idx_chunks_document_id ON chunks(document_id);
 CREATE INDEX idx_chunks_vector_id ON chunks(vector_id);
 CREATE INDEX idx_queries_created_at ON queries(created_at);